@@ -0,0 +1,92 @@
+"""Cold-start import time of the start page and every page.
+
+Each page's module-level imports are replayed in a fresh interpreter, so the
+numbers are what a new Streamlit process pays before the page can render.
+Run from anywhere:
+
+    python benchmarks/cold_start.py --repeat 5 --budget-ms 1500 --output cold_start.json
+
+The exit status is 1 when a page is over budget, so the script can gate a
+deploy and its JSON output can be kept to compare releases.
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+exec(compile({code!r}, {page!r}, "exec"))
+print(time.perf_counter() - started)
+"""
+
+
+def pages():
+    return ["start-page.py"] + sorted(os.path.relpath(path, ROOT) for path in glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+
+def module_imports(page):
+    with open(os.path.join(ROOT, page), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def measure(code, page="<baseline>"):
+    probe = PROBE.format(root=ROOT, code=code, page=page)
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit status {result.returncode}")
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+def run(repeat, budget_ms=None):
+    baseline = statistics.median(measure("import streamlit") for _ in range(repeat))
+    report = {"ts": time.time(), "python": sys.version.split()[0], "repeat": repeat, "budget_ms": budget_ms,
+              "baseline_ms": round(baseline, 1), "pages": {}}
+    for page in pages():
+        code = module_imports(page)
+        try:
+            samples = [measure(code, page) for _ in range(repeat)]
+        except RuntimeError as e:
+            report["pages"][page] = {"error": str(e)}
+            continue
+        median = statistics.median(samples)
+        report["pages"][page] = {
+            "imports": code.splitlines(),
+            "median_ms": round(median, 1),
+            "max_ms": round(max(samples), 1),
+            # Time spent beyond importing Streamlit itself.
+            "over_baseline_ms": round(median - baseline, 1),
+            "over_budget": budget_ms is not None and median > budget_ms,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.budget_ms)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    failed = [page for page, result in report["pages"].items() if result.get("over_budget") or "error" in result]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Offline benchmark of the resume pipelines behind each page.
+
+A synthetic corpus of resumes with different page counts goes through the
+same modules the pages use: PDF text extraction, chunking, embedding into
+the vector index, then each page's chain. ChatOpenAI, OpenAIEmbeddings and
+the Gemini classes are replaced by deterministic local stand-ins with
+configurable latency, so no network, API key or MongoDB is needed:
+
+    python benchmarks/pipeline.py --pages 1,2,4,8 --resumes 3 --llm-latency-ms 300 --output pipeline.json
+
+Per-stage p50/p95 (milliseconds) and the peak traced memory per page count
+are printed as JSON. Every resume is unique, so each run measures the cold
+path: the shared LLM response cache is not installed, and Job Match's own
+semantic cache never hits.
+"""
+import argparse
+import functools
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "python go java sql kafka docker kubernetes spark airflow react typescript aws gcp terraform "
+    "designed built led migrated optimised scaled automated shipped mentored reduced latency cost "
+    "platform pipeline service api dashboard model warehouse cluster team customers revenue"
+).split()
+SECTIONS = ["Summary", "Education", "Experience", "Projects", "Skills", "Certifications"]
+
+SCREENING_RESPONSE = '{"name": "Stub Applicant", "rating": 72}'
+SKILL_GAP_RESPONSE = json.dumps({
+    "candidate_skills": ["python", "sql"],
+    "required_skills": ["python", "sql", "kubernetes"],
+    "missing_skills": ["kubernetes"],
+    "gap_analysis": "The candidate covers most of the role but has not run workloads on Kubernetes.",
+    "courses": [{"title": "Kubernetes Basics", "skill": "kubernetes", "link": "https://example.com/k8s"}],
+})
+CHAT_RESPONSE = (
+    "The resume fits a backend engineering role best, followed by data engineering. "
+    "Expected salary is around 18 to 24 lakh rupees per year given the listed experience."
+)
+JOB_MATCH_RESPONSE = "78%. Strong Python and service design experience; Kubernetes appears only in side projects."
+JOB_DESCRIPTION = "Backend engineer with Python and Kubernetes"
+# Prompts as sent by pages/ResumeAnalysis.py and pages/JobMatch.py.
+RESUME_ANALYSIS_PROMPT = '''You are an experienced Human Resource Manager who is specialized in analyzing the job resumes of the candidate.
+            You have been asked to analyze the resume of a candidate and provide the feedback. Analyze the strength and weakness of the resume and provide the feedback.
+            The output should be provided as personal details in 5 points and then provide the strength and weakness of the resume.'''
+JOB_MATCH_PROMPT = '''Rate the resume on a scale of 1 to 100 percentage based on the job specifications: "{job_description}" and provide feedback on the same in about 50 words.'''
+CHAT_QUESTIONS = [
+    "Suggest best suited job for this resume by providing the two best job options and expected salary in rupees in about 50 words",
+    "Which skills should be highlighted more?",
+    "Summarise the most recent role.",
+]
+
+
+def make_resume_pdf(pages, seed):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        y = 750
+        if page == 0:
+            pdf.drawString(50, y, f"Applicant {seed}")
+            y -= 20
+        for section in rng.sample(SECTIONS, 3):
+            pdf.drawString(50, y, section.upper())
+            y -= 16
+            for _ in range(rng.randint(8, 12)):
+                pdf.drawString(60, y, "- " + " ".join(rng.choice(WORDS) for _ in range(14)))
+                y -= 14
+            y -= 8
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class NamedBytes(io.BytesIO):
+    # Stands in for Streamlit's UploadedFile.
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def make_stubs(embed_latency, llm_latency, token_latency, dim):
+    import numpy as np
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    from chunking import count_tokens
+
+    class StubEmbeddings(Embeddings):
+        def __init__(self, model):
+            self.model = model
+
+        def _vector(self, text):
+            seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+            return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+        def embed_documents(self, texts):
+            time.sleep(embed_latency)
+            return [self._vector(text) for text in texts]
+
+        def embed_query(self, text):
+            time.sleep(embed_latency)
+            return self._vector(text)
+
+    class StubChatModel(BaseChatModel):
+        response: str
+        model_name: str = "stub"
+        streaming: bool = False
+
+        @property
+        def _llm_type(self):
+            return "stub-chat"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            if self.streaming:
+                # Like ChatOpenAI(streaming=True): tokens reach the callbacks
+                # even when the chain calls invoke rather than stream.
+                for _ in self._stream(messages, stop, run_manager, **kwargs):
+                    pass
+            else:
+                time.sleep(llm_latency + token_latency * len(self.response.split()))
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(llm_latency)
+            for word in self.response.split(" "):
+                time.sleep(token_latency)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+
+        def get_num_tokens(self, text):
+            return count_tokens(text)
+
+        def get_num_tokens_from_messages(self, messages):
+            return sum(count_tokens(message.content) for message in messages)
+
+    return StubEmbeddings, StubChatModel
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, pipeline, stage, seconds):
+        self.samples[(pipeline, stage)].append(seconds * 1000)
+
+    def time(self, pipeline, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(pipeline, stage, time.perf_counter() - start)
+        return result
+
+    def report(self):
+        stages = defaultdict(dict)
+        for (pipeline, stage), samples in sorted(self.samples.items()):
+            stages[pipeline][stage] = {
+                "n": len(samples),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+            }
+        return stages
+
+
+def first_token_timer():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class FirstToken(BaseCallbackHandler):
+        def __init__(self):
+            self.started = time.perf_counter()
+            self.first = None
+
+        def on_llm_new_token(self, token, **kwargs):
+            if self.first is None:
+                self.first = time.perf_counter()
+
+    return FirstToken()
+
+
+@functools.lru_cache(maxsize=None)
+def job_match_cache(StubEmbeddings):
+    # Shared by every resume, like the page's semantic cache.
+    from embedding_cache import CachedEmbeddings
+    from llm_cache import ResponseCache, question_pattern
+
+    return ResponseCache(
+        namespace="job_match_benchmark",
+        embedding=CachedEmbeddings(StubEmbeddings("text-embedding-ada-002")),
+        question=question_pattern(JOB_MATCH_PROMPT, "job_description"),
+    )
+
+
+def run_resume(recorder, size, pdf, stubs):
+    from langchain.chains import ConversationalRetrievalChain
+    from langchain.memory import ConversationBufferMemory, ConversationTokenBufferMemory
+
+    from chunking import chunk_resume
+    from embedding_cache import CachedEmbeddings
+    from pdf_text import get_pdf_text
+    from skill_gap import get_skill_gap_chain
+    from vector_index import InMemoryVectorIndex
+
+    StubEmbeddings, StubChatModel = stubs
+    ingest = f"ingest/{size}p"
+    text = recorder.time(ingest, "pdf_text", get_pdf_text, pdf)
+    chunks = recorder.time(ingest, "chunk", chunk_resume, text)
+    openai_index = recorder.time(ingest, "index", InMemoryVectorIndex.from_texts, chunks, CachedEmbeddings(StubEmbeddings("text-embedding-ada-002")))
+    gemini_index = InMemoryVectorIndex.from_texts(chunks, CachedEmbeddings(StubEmbeddings("models/embedding-001")))
+
+    # Resume Chat: follow-up questions go through the condense step and the
+    # token-bounded memory, as on the page.
+    llm = StubChatModel(response=CHAT_RESPONSE, streaming=True)
+    chat = ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        condense_question_llm=StubChatModel(response="Standalone question?"),
+        memory=ConversationTokenBufferMemory(llm=llm, max_token_limit=2000, memory_key="chat_history", return_messages=True),
+        retriever=openai_index.as_retriever(),
+    )
+    for turn, question in enumerate(CHAT_QUESTIONS):
+        timer = first_token_timer()
+        recorder.time("resume_chat", "turn" if turn else "first_turn", chat, {"question": question}, callbacks=[timer])
+        recorder.add("resume_chat", "ttft", (timer.first or time.perf_counter()) - timer.started)
+
+    # Resume Analysis: the fixed analysis prompt with buffer memory.
+    analysis = ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        memory=ConversationBufferMemory(memory_key="chat_history", return_messages=True),
+        retriever=openai_index.as_retriever(),
+    )
+    timer = first_token_timer()
+    recorder.time("resume_analysis", "chain", analysis, {"question": RESUME_ANALYSIS_PROMPT}, callbacks=[timer])
+    recorder.add("resume_analysis", "ttft", (timer.first or time.perf_counter()) - timer.started)
+
+    # Job Match: the rating prompt with no history, on a model behind the
+    # semantic cache. Every resume is new, so this is the cache-miss path.
+    job_match = ConversationalRetrievalChain.from_llm(
+        llm=StubChatModel(response=JOB_MATCH_RESPONSE, streaming=True, cache=job_match_cache(StubEmbeddings)),
+        retriever=openai_index.as_retriever(),
+    )
+    timer = first_token_timer()
+    question = JOB_MATCH_PROMPT.format(job_description=JOB_DESCRIPTION)
+    recorder.time("job_match", "chain", job_match, {"question": question, "chat_history": ""}, callbacks=[timer])
+    recorder.add("job_match", "ttft", (timer.first or time.perf_counter()) - timer.started)
+
+    # Course Recommender: invoked like the page, so that the LLM cache applies.
+    chain = get_skill_gap_chain(gemini_index, StubChatModel(response=SKILL_GAP_RESPONSE, streaming=True))
+    timer = first_token_timer()
+    recorder.time("skill_gap", "chain", chain.invoke, {"job_role": "Backend Engineer", "work_experience": "5"}, config={"callbacks": [timer]})
+    recorder.add("skill_gap", "ttft", (timer.first or time.perf_counter()) - timer.started)
+
+
+def run_screening(recorder, pdfs, stubs, max_workers):
+    from embedding_cache import CachedEmbeddings
+    from screening import screen_resumes
+
+    StubEmbeddings, StubChatModel = stubs
+    llm = StubChatModel(response=SCREENING_RESPONSE)
+    embedding = CachedEmbeddings(StubEmbeddings("text-embedding-ada-002"))
+    start = time.perf_counter()
+    for result in screen_resumes(pdfs, JOB_DESCRIPTION, llm, embedding,
+                                 max_workers=max_workers, requests_per_minute=0):
+        recorder.add("screening", "per_resume", result.seconds)
+    recorder.add("screening", f"batch_of_{len(pdfs)}", time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="1,2,4,8", help="comma separated page counts")
+    parser.add_argument("--resumes", type=int, default=3, help="resumes per page count")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated time to first token")
+    parser.add_argument("--token-latency-ms", type=float, default=0, help="simulated time per streamed token")
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="simulated time per embedding call")
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimension")
+    parser.add_argument("--max-workers", type=int, default=8, help="screening concurrency")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Caches go to a scratch directory and the resume store stays local, so
+    # the run is cold, offline and leaves nothing behind in the repo.
+    os.environ["COMPLAN_CACHE_DIR"] = tempfile.mkdtemp(prefix="complan-bench-")
+    os.environ["RESUME_STORE"] = "0"
+    sys.path.insert(0, ROOT)
+
+    stubs = make_stubs(args.embed_latency_ms / 1000, args.llm_latency_ms / 1000, args.token_latency_ms / 1000, args.dim)
+    sizes = [int(size) for size in args.pages.split(",")]
+    recorder = Recorder()
+    peak_memory = {}
+    seed = 0
+    for size in sizes:
+        pdfs = []
+        for _ in range(args.resumes):
+            seed += 1
+            pdfs.append(NamedBytes(make_resume_pdf(size, seed), f"applicant_{seed}.pdf"))
+        for pdf in pdfs:
+            run_resume(recorder, size, pdf, stubs)
+        seed += 1
+        screening_pdfs = [NamedBytes(make_resume_pdf(size, seed * 1000 + i), f"screen_{seed}_{i}.pdf") for i in range(args.resumes)]
+        run_screening(recorder, screening_pdfs, stubs, args.max_workers)
+
+        if not args.no_memory:
+            # Separate pass: tracing slows every allocation down.
+            seed += 1
+            tracemalloc.start()
+            run_resume(Recorder(), size, NamedBytes(make_resume_pdf(size, seed), f"traced_{seed}.pdf"), stubs)
+            peak_memory[f"{size}p"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+
+    report = {
+        "ts": time.time(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "stages": recorder.report(),
+        "peak_memory_kb": peak_memory,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
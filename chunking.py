@@ -0,0 +1,127 @@
+import logging
+import os
+import re
+from functools import lru_cache
+
+import metrics
+from disk_cache import DiskCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Encoding of the OpenAI embedding models; close enough for Gemini's limits.
+ENCODING = "cl100k_base"
+CHUNK_TOKENS = int(os.getenv("RESUME_CHUNK_TOKENS", "300"))
+
+SECTION_HEADINGS = (
+    "summary", "professional summary", "profile", "objective", "career objective", "about me",
+    "education", "academic background", "qualifications",
+    "experience", "work experience", "professional experience", "employment history", "internships?",
+    "skills", "technical skills", "key skills", "core competencies",
+    "projects", "academic projects", "personal projects",
+    "certifications?", "courses", "achievements", "awards", "publications",
+    "languages", "interests", "hobbies", "extra[- ]curricular activities", "references", "contact",
+)
+# A line that is nothing but a heading, e.g. "EDUCATION" or "Work Experience:".
+_HEADING = re.compile(r"^\s*(?:%s)\s*:?\s*$" % "|".join(SECTION_HEADINGS), re.IGNORECASE)
+
+_cache = DiskCache("chunks", max_entries=1024)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(ENCODING)
+    except Exception as e:
+        # tiktoken downloads the encoding on first use; without it, fall back
+        # to the usual four characters per token.
+        logger.warning("tiktoken encoding %s unavailable, estimating tokens: %s", ENCODING, e)
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_sections(text):
+    sections = []
+    current = []
+    for line in text.splitlines():
+        if _HEADING.match(line) and any(previous.strip() for previous in current):
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    sections.append("\n".join(current).strip())
+    return [section for section in sections if section]
+
+
+def _split_line(line, max_tokens):
+    encoding = _encoding()
+    if encoding is None:
+        step = max_tokens * 4
+        return [line[i:i + step] for i in range(0, len(line), step)]
+    tokens = encoding.encode(line, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def _pack(pieces, max_tokens, separator):
+    # Greedily joins (text, tokens) pieces into chunks of at most max_tokens.
+    chunks = []
+    current = []
+    size = 0
+    for text, tokens in pieces:
+        if current and size + tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current = []
+            size = 0
+        current.append(text)
+        size += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    # Whole sections are packed together until the token budget is reached; a
+    # section is only cut, on line boundaries, when it is larger than the
+    # budget by itself. Chunks do not overlap, so no text is embedded twice.
+    pieces = []
+    for section in split_sections(text):
+        tokens = count_tokens(section)
+        if tokens <= max_tokens:
+            pieces.append((section, tokens))
+            continue
+        lines = []
+        for line in section.splitlines():
+            if not line.strip():
+                continue
+            line_tokens = count_tokens(line)
+            if line_tokens <= max_tokens:
+                lines.append((line, line_tokens))
+            else:
+                lines.extend((part, count_tokens(part)) for part in _split_line(line, max_tokens))
+        pieces.extend((chunk, count_tokens(chunk)) for chunk in _pack(lines, max_tokens, "\n"))
+    return _pack(pieces, max_tokens, "\n\n")
+
+
+def chunking_name(max_tokens=CHUNK_TOKENS):
+    return f"sections-{ENCODING}-{max_tokens}"
+
+
+# Identifies these chunks wherever they are stored next to their embeddings.
+CHUNKING = chunking_name()
+
+
+def chunk_resume(text, max_tokens=CHUNK_TOKENS):
+    key = f"{chunking_name(max_tokens)}:{content_hash(text)}"
+    chunks = _cache.get(key)
+    metrics.cache("chunks", hits=int(chunks is not None), misses=int(chunks is None))
+    if chunks is None:
+        with metrics.stage("chunk"):
+            chunks = chunk_text(text, max_tokens)
+        _cache.set(key, chunks)
+    return chunks
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CACHE_DIR = os.getenv("COMPLAN_CACHE_DIR", "./.complan_cache")
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    # Bounded JSON key/value store with one file per entry. Reads refresh the
+    # file's mtime, so eviction drops the least recently used entries first.
+    def __init__(self, namespace, max_entries=256, ttl=None):
+        self.path = os.path.join(CACHE_DIR, namespace)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, content_hash(key) + ".json")
+
+    def get(self, key, default=None, stale=False):
+        path = self._file(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return default
+        if self.ttl is not None and not stale and time.time() - entry["created"] > self.ttl:
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def set(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "value": value}, f)
+        os.replace(tmp_path, self._file(key))
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.path):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.path, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
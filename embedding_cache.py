@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import metrics
+from chunking import count_tokens
+from disk_cache import CACHE_DIR, content_hash
+
+EMBEDDING_DB = os.path.join(CACHE_DIR, "embeddings.db")
+
+# SQLite limits the number of bound parameters per statement.
+_LOOKUP_BATCH = 500
+
+
+class EmbeddingStore:
+    def __init__(self, path=EMBEDDING_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        conn.commit()
+
+    def _connect(self):
+        # sqlite3 connections must not be shared between threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model, hashes):
+        hashes = list(hashes)
+        found = {}
+        conn = self._connect()
+        for i in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = hashes[i:i + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *batch],
+            )
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model, items):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, digest, np.asarray(vector, dtype=np.float32).tobytes()) for digest, vector in items],
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
+
+
+def embedding_model_name(embedding):
+    return f"{type(embedding).__name__}:{getattr(embedding, 'model', '')}"
+
+
+class CachedEmbeddings(Embeddings):
+    # Wraps an existing LangChain embedding object. Vectors are keyed by
+    # (model, sha256(text)); only the misses are sent upstream, in one batch.
+    def __init__(self, embedding, store=None):
+        self.embedding = embedding
+        self.model = embedding_model_name(embedding)
+        self.store = store or get_embedding_store()
+
+    def embed_documents(self, texts):
+        return self._embed(texts, "document", self.embedding.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda texts: [self.embedding.embed_query(texts[0])])[0]
+
+    def _embed(self, texts, kind, embed_fn):
+        model = f"{self.model}:{kind}"
+        hashes = [content_hash(text) for text in texts]
+        found = self.store.get_many(model, set(hashes))
+
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in found:
+                missing.setdefault(digest, text)
+        metrics.cache("embeddings", hits=len(texts) - len(missing), misses=len(missing))
+        if missing:
+            start = time.perf_counter()
+            vectors = embed_fn(list(missing.values()))
+            seconds = time.perf_counter() - start
+            # Embedding APIs do not report usage through LangChain, so the
+            # tokens are counted locally for the cost estimate.
+            tokens = sum(count_tokens(text) for text in missing.values())
+            metrics.llm_usage(getattr(self.embedding, "model", None) or self.model, tokens, 0, seconds, stage_name="embed")
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(model, fresh.items())
+            found.update((digest, np.asarray(vector, dtype=np.float32)) for digest, vector in fresh.items())
+
+        return [found[digest].tolist() for digest in hashes]
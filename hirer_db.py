@@ -0,0 +1,215 @@
+import time
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, MetaData, String, Table, UniqueConstraint, case, func, inspect, select, text
+from sqlalchemy.dialects.sqlite import insert
+
+import metrics
+import resources
+from disk_cache import content_hash
+
+DATABASE_URL = "sqlite:///./hirer.db"
+# Specification the ratings stored before job specifications were kept are
+# filed under.
+LEGACY_JOB_SPECIFICATION = "(ratings from before job specifications were stored)"
+
+metadata_obj = MetaData()
+
+# One row per distinct job specification text. ratings_version is bumped by
+# every write to its ratings, so readers can cache what they derive from them.
+job_spec = Table(
+    'job_spec',
+    metadata_obj,
+    Column('id', Integer, primary_key=True),
+    Column('specification', String, nullable=False),
+    Column('spec_hash', String, nullable=False, unique=True),
+    Column('created', Float, nullable=False),
+    Column('ratings_version', Integer, nullable=False, server_default=text("0")),
+)
+
+# One rating per resume and job specification; a resume screened for a
+# second role gets a second row. The (job_spec_id, rating) index serves the
+# shortlist and its ordering without a sort.
+job = Table(
+    'job',
+    metadata_obj,
+    Column('id', Integer, primary_key=True),
+    Column('job_spec_id', Integer, ForeignKey('job_spec.id'), nullable=False),
+    Column('resume_hash', String, nullable=False),
+    Column('applicant_name', String),
+    Column('rating', Integer),
+    Column('similarity', Float),
+    UniqueConstraint('job_spec_id', 'resume_hash'),
+    Index('ix_job_job_spec_id_rating', 'job_spec_id', 'rating'),
+)
+
+# Background screening runs (screening_jobs); each resume of a run has a row
+# in screening_result that the worker fills in as it is screened.
+screening_job = Table(
+    'screening_job',
+    metadata_obj,
+    Column('id', Integer, primary_key=True),
+    Column('job_specification', String, nullable=False),
+    Column('job_spec_id', Integer, ForeignKey('job_spec.id')),
+    Column('top_k', Integer, nullable=False),
+    Column('status', String, nullable=False),  # queued, running, done, failed
+    Column('total', Integer, nullable=False),
+    Column('error', String),
+    Column('created', Float, nullable=False),
+    Column('started', Float),
+    Column('finished', Float),
+)
+
+screening_result = Table(
+    'screening_result',
+    metadata_obj,
+    Column('id', Integer, primary_key=True),
+    Column('job_id', Integer, ForeignKey('screening_job.id'), nullable=False),
+    Column('position', Integer, nullable=False),
+    Column('resume', String, nullable=False),
+    Column('done', Integer, nullable=False, default=0),
+    Column('applicant_name', String),
+    Column('similarity', Float),
+    Column('rating', Integer),
+    Column('seconds', Float),
+    Column('error', String),
+    UniqueConstraint('job_id', 'position'),
+)
+
+
+class Candidate(NamedTuple):
+    applicant_name: str
+    rating: Optional[int]
+    similarity: Optional[float] = None
+    resume_hash: Optional[str] = None
+
+
+def get_engine():
+    return resources.get_engine(DATABASE_URL)
+
+
+def _job_spec_id(conn, specification):
+    digest = content_hash(specification.strip())
+    conn.execute(
+        insert(job_spec)
+        .values(specification=specification, spec_hash=digest, created=time.time())
+        .on_conflict_do_nothing(index_elements=[job_spec.c.spec_hash])
+    )
+    return conn.execute(select(job_spec.c.id).where(job_spec.c.spec_hash == digest)).scalar_one()
+
+
+def get_job_spec_id(specification):
+    with get_engine().begin() as conn:
+        return _job_spec_id(conn, specification)
+
+
+def _migrate_legacy_job(conn, columns):
+    # The first `job` table held one rating per applicant name, with no job
+    # specification. Its rows are moved under a placeholder specification,
+    # keyed by applicant name since the resume is not known.
+    conn.execute(text("ALTER TABLE job RENAME TO job_legacy"))
+    job_spec.create(conn, checkfirst=True)
+    job.create(conn)
+    similarity = "similarity" if "similarity" in columns else "NULL"
+    conn.execute(
+        text(
+            "INSERT INTO job (job_spec_id, resume_hash, applicant_name, rating, similarity) "
+            f"SELECT :job_spec_id, 'legacy:' || applicant_name, applicant_name, rating, {similarity} "
+            "FROM job_legacy WHERE applicant_name IS NOT NULL"
+        ),
+        {"job_spec_id": _job_spec_id(conn, LEGACY_JOB_SPECIFICATION)},
+    )
+    conn.execute(text("DROP TABLE job_legacy"))
+
+
+def create_database():
+    with get_engine().begin() as conn:
+        tables = inspect(conn)
+        if tables.has_table('job'):
+            columns = {column["name"] for column in tables.get_columns('job')}
+            if 'job_spec_id' not in columns:
+                _migrate_legacy_job(conn, columns)
+        metadata_obj.create_all(conn)
+        columns = {column["name"] for column in inspect(conn).get_columns('job_spec')}
+        if 'ratings_version' not in columns:
+            conn.execute(text("ALTER TABLE job_spec ADD COLUMN ratings_version INTEGER NOT NULL DEFAULT 0"))
+        columns = {column["name"] for column in inspect(conn).get_columns('screening_job')}
+        if 'job_spec_id' not in columns:
+            conn.execute(text("ALTER TABLE screening_job ADD COLUMN job_spec_id INTEGER REFERENCES job_spec (id)"))
+            specifications = conn.execute(select(screening_job.c.job_specification).distinct()).scalars().all()
+            for specification in specifications:
+                conn.execute(
+                    screening_job.update()
+                    .where(screening_job.c.job_specification == specification)
+                    .values(job_spec_id=_job_spec_id(conn, specification))
+                )
+
+
+def save_ratings(job_spec_id, candidates):
+    # Upserts every Candidate of a batch in one transaction, keyed by job
+    # specification and resume. Candidates that were filtered out before LLM
+    # rating carry no rating and keep any rating stored earlier.
+    rows = [
+        {
+            "job_spec_id": job_spec_id,
+            "resume_hash": c.resume_hash,
+            "applicant_name": c.applicant_name,
+            "rating": c.rating,
+            "similarity": c.similarity,
+        }
+        for c in candidates
+    ]
+    if not rows:
+        return 0
+    stmt = insert(job)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[job.c.job_spec_id, job.c.resume_hash],
+        set_={
+            # The name read by the rater is kept over one taken from a file name.
+            "applicant_name": case((stmt.excluded.rating.is_(None), job.c.applicant_name), else_=stmt.excluded.applicant_name),
+            "rating": func.coalesce(stmt.excluded.rating, job.c.rating),
+            "similarity": stmt.excluded.similarity,
+        },
+    )
+    with metrics.stage("db_write", rows=len(rows)), get_engine().begin() as conn:
+        conn.execute(stmt, rows)
+        conn.execute(
+            job_spec.update()
+            .where(job_spec.c.id == job_spec_id)
+            .values(ratings_version=job_spec.c.ratings_version + 1)
+        )
+    return len(rows)
+
+
+def ratings_version(job_spec_id):
+    with get_engine().connect() as conn:
+        return conn.execute(select(job_spec.c.ratings_version).where(job_spec.c.id == job_spec_id)).scalar() or 0
+
+
+def shortlist(job_spec_id, k=2, min_rating=60) -> List[Candidate]:
+    # The k best rated candidates for one job specification, read straight
+    # off the (job_spec_id, rating) index. min_rating=None only leaves out
+    # unrated candidates.
+    threshold = job.c.rating > min_rating if min_rating is not None else job.c.rating.is_not(None)
+    query = (
+        select(job.c.applicant_name, job.c.rating, job.c.similarity, job.c.resume_hash)
+        .where(job.c.job_spec_id == job_spec_id, threshold)
+        .order_by(job.c.rating.desc())
+        .limit(k)
+    )
+    with get_engine().connect() as conn:
+        return [Candidate(*row) for row in conn.execute(query)]
+
+
+def rating_histogram(job_spec_id, bin_width=10):
+    # (lowest rating of the bin, candidates) for every non-empty bin,
+    # counted from the index alone.
+    low = (job.c.rating // bin_width) * bin_width
+    query = (
+        select(low, func.count())
+        .where(job.c.job_spec_id == job_spec_id, job.c.rating.is_not(None))
+        .group_by(low)
+        .order_by(low)
+    )
+    with get_engine().connect() as conn:
+        return [tuple(row) for row in conn.execute(query)]
@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from disk_cache import DiskCache
+from resources import shared
+
+logger = logging.getLogger(__name__)
+
+STATS_URL = "https://leetcode-stats-api.herokuapp.com/{username}/"
+# (connect, read) seconds; a slow upstream never holds a request longer.
+TIMEOUT = (3.05, float(os.getenv("LEETCODE_READ_TIMEOUT", "5")))
+STATS_TTL = int(os.getenv("LEETCODE_STATS_TTL", str(6 * 60 * 60)))
+UNAVAILABLE_MESSAGE = "Could not reach backend, try again later."
+
+# Expired entries stay on disk until evicted and are served when the upstream
+# is down.
+_cache = DiskCache("leetcode_stats", max_entries=1024, ttl=STATS_TTL)
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="leetcode-prefetch")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _make_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+    session.headers["Accept"] = "application/json"
+    return session
+
+
+def get_session():
+    return shared(("leetcode_session",), _make_session, close=lambda session: session.close())
+
+
+def normalize_username(username):
+    return username.strip().lower()
+
+
+def fetch_stats(username):
+    response = get_session().get(STATS_URL.format(username=username.strip()), timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_stats(username):
+    key = normalize_username(username)
+    stats = _cache.get(key)
+    if stats is not None:
+        return stats
+    try:
+        stats = fetch_stats(username)
+    except Exception as e:
+        logger.warning("could not fetch LeetCode stats for %s: %s", key, e)
+        stale = _cache.get(key, stale=True)
+        if stale is not None:
+            return stale
+        return {"status": "error", "message": UNAVAILABLE_MESSAGE}
+    # Unknown users come back as {"status": "error"} and are not cached.
+    if stats.get("status") == "success":
+        _cache.set(key, stats)
+    return stats
+
+
+def prefetch(username):
+    # Starts fetching in the background; get_prefetched_stats picks the
+    # result up. Repeated calls for the same user share one request.
+    key = normalize_username(username)
+    if not key:
+        return
+    with _inflight_lock:
+        if key in _inflight:
+            return
+        future = _prefetch_pool.submit(get_stats, username)
+        _inflight[key] = future
+    # Registered outside the lock: a future that has already finished runs
+    # the callback at once, on this thread, and _forget takes the lock.
+    future.add_done_callback(lambda _: _forget(key, future))
+
+
+def _forget(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def get_prefetched_stats(username, timeout=sum(TIMEOUT)):
+    with _inflight_lock:
+        future = _inflight.get(normalize_username(username))
+    if future is None:
+        return get_stats(username)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        return _cache.get(normalize_username(username), stale=True) or {"status": "error", "message": UNAVAILABLE_MESSAGE}
@@ -0,0 +1,150 @@
+import json
+import logging
+import re
+import threading
+import time
+import warnings
+
+import numpy as np
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.load import dumps, loads
+
+import metrics
+from disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# langchain_core.load.loads is marked beta; it is the same (de)serialiser the
+# bundled LangChain caches use.
+warnings.filterwarnings("ignore", category=LangChainBetaWarning, module=__name__)
+
+LLM_CACHE_TTL = 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 4096
+SEMANTIC_THRESHOLD = 0.97
+SEMANTIC_MAX_ENTRIES = 512
+
+
+def question_pattern(template, field):
+    # Matches `template` rendered with any value for {field}; the value is the
+    # only group.
+    before, after = template.split("{" + field + "}")
+    return re.compile(re.escape(before) + "(.*)" + re.escape(after), re.DOTALL)
+
+
+def _split_prompt(prompt, question=None):
+    # Chat models hand the cache their messages serialised as JSON. Everything
+    # before the last message (system prompt, retrieved resume context, chat
+    # history) must match exactly; only the last message is compared by
+    # meaning. With a `question` pattern, only its group is compared and the
+    # fixed template text around it joins the exact part, so a long
+    # instruction does not outweigh the words that differ. Returns None for a
+    # prompt the pattern does not match; it is only cached exactly.
+    prefix, last = "", prompt
+    try:
+        messages = json.loads(prompt)
+        content = messages[-1]["kwargs"]["content"]
+        if isinstance(content, str):
+            prefix, last = json.dumps(messages[:-1], sort_keys=True), content
+    except (ValueError, TypeError, KeyError, IndexError):
+        pass
+    if question is None:
+        return prefix, last
+    match = question.fullmatch(last)
+    if match is None:
+        return None
+    return prefix + "\x00" + question.pattern, match.group(1)
+
+
+def _without_usage(generations):
+    # A cached answer costs no tokens; drop the usage recorded with it so the
+    # usage metrics only count real calls.
+    generations = list(generations)
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if message is not None and getattr(message, "usage_metadata", None):
+            message.usage_metadata = None
+    return generations
+
+
+class ResponseCache(BaseCache):
+    # LangChain consults this before every ChatOpenAI / ChatGoogleGenerativeAI
+    # call. The exact tier is keyed by the llm_string (model and parameters) and
+    # the fully rendered prompt, which already carries the prompt template and
+    # the resume content. With an embedding, a semantic tier also returns the
+    # answer to a near-identical question over the same context (e.g. a
+    # re-worded job description). `question` (see question_pattern) restricts
+    # the comparison to the part of the question that varies.
+    def __init__(self, namespace="llm_responses", ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 embedding=None, threshold=SEMANTIC_THRESHOLD, max_semantic_entries=SEMANTIC_MAX_ENTRIES,
+                 question=None):
+        self._exact = DiskCache(namespace, max_entries=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.embedding = embedding
+        self.question = question
+        self.threshold = threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._semantic = []
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt, llm_string):
+        hit = self._exact.get(llm_string + "\x00" + prompt)
+        metrics.cache("llm_response", hits=int(hit is not None), misses=int(hit is None))
+        if hit is not None:
+            return _without_usage(loads(generation) for generation in hit)
+        if self.embedding is not None:
+            generations = self._semantic_lookup(prompt, llm_string)
+            metrics.cache("llm_semantic", hits=int(generations is not None), misses=int(generations is None))
+            return generations
+        return None
+
+    def update(self, prompt, llm_string, return_val):
+        generations = [dumps(generation) for generation in return_val]
+        self._exact.set(llm_string + "\x00" + prompt, generations)
+        split = _split_prompt(prompt, self.question) if self.embedding is not None else None
+        if split is not None:
+            prefix, question = split
+            vector = self._embed(question)
+            if vector is not None:
+                with self._lock:
+                    self._semantic.append((llm_string + "\x00" + prefix, vector, time.time(), generations))
+                    del self._semantic[:-self.max_semantic_entries]
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._semantic.clear()
+
+    def _embed(self, text):
+        try:
+            vector = np.asarray(self.embedding.embed_query(text), dtype=np.float32)
+        except Exception:
+            logger.exception("could not embed prompt for the semantic cache")
+            return None
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _semantic_lookup(self, prompt, llm_string):
+        split = _split_prompt(prompt, self.question)
+        if split is None:
+            return None
+        prefix, question = split
+        scope = llm_string + "\x00" + prefix
+        now = time.time()
+        with self._lock:
+            self._semantic = [entry for entry in self._semantic if now - entry[2] <= self.ttl]
+            candidates = [entry for entry in self._semantic if entry[0] == scope]
+        if not candidates:
+            return None
+        vector = self._embed(question)
+        if vector is None:
+            return None
+        scores = np.stack([entry[1] for entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return _without_usage(loads(generation) for generation in candidates[best][3])
+
+
+def install_llm_cache():
+    if not isinstance(get_llm_cache(), ResponseCache):
+        set_llm_cache(ResponseCache())
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+
+def token_usage(response):
+    # Chat models report usage on each message; completion models (the SQL
+    # agent's OpenAI LLM) only in llm_output.
+    tokens_in = tokens_out = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+                found = True
+    if not found:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens_in = usage.get("prompt_tokens", 0)
+        tokens_out = usage.get("completion_tokens", 0)
+    return tokens_in, tokens_out
+
+
+class UsageHandler(BaseCallbackHandler):
+    # Attached to every model built in resources: records the duration,
+    # tokens and estimated cost of each call. One handler serves concurrent
+    # calls (screening workers), so start times are kept per run.
+    def __init__(self, model):
+        self.model = model
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def _elapsed(self, run_id):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens_in, tokens_out = token_usage(response)
+        model = (response.llm_output or {}).get("model_name") or self.model
+        metrics.llm_usage(model, tokens_in, tokens_out, self._elapsed(run_id))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        metrics.llm_usage(self.model, 0, 0, self._elapsed(run_id), error=type(error).__name__)
@@ -1,5 +1,4 @@
 import streamlit as st
-from streamlit_option_menu import option_menu
 def authenticated_menu():
     if st.sidebar.button("Switch Accounts"):
         st.session_state.role = None
@@ -24,6 +23,9 @@ def unauthenticated_menu():
     st.sidebar.divider()
 
 def menu():
+    import metrics
+
+    metrics.debug_panel()
     if "role" not in st.session_state or st.session_state.role is None:
         unauthenticated_menu()
         return
@@ -0,0 +1,357 @@
+import contextvars
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from disk_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = os.path.join(CACHE_DIR, "metrics.jsonl")
+# COMPLAN_METRICS_FILE=0 keeps the numbers in memory (endpoint, debug panel)
+# without writing events to disk.
+METRICS_FILE_ENABLED = os.getenv("COMPLAN_METRICS_FILE", "1") != "0"
+# Past this size the file is moved to metrics.jsonl.1, replacing the previous
+# one, and a new file is started.
+METRICS_FILE_MAX_BYTES = int(os.getenv("COMPLAN_METRICS_FILE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Prometheus text endpoint at http://<host>:<port>/metrics; off unless a port
+# is configured.
+METRICS_HOST = os.getenv("COMPLAN_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("COMPLAN_METRICS_PORT", "0"))
+# Sidebar panel with the session's numbers; also shown with ?debug=1.
+DEBUG_PANEL = os.getenv("COMPLAN_DEBUG_PANEL", "0") == "1"
+MAX_SESSIONS = 256
+
+# USD per million (input, output) tokens, at list price. Model names are
+# matched by prefix, so dated snapshots (gpt-4o-2024-08-06) are covered;
+# unknown models are costed at zero.
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo-instruct": (1.50, 2.00),
+    "text-embedding-ada-002": (0.10, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+
+_lock = threading.Lock()
+# Separate from _lock so that file I/O does not hold up the totals.
+_file_lock = threading.Lock()
+_session = contextvars.ContextVar("metrics_session", default=None)
+_request = contextvars.ContextVar("metrics_request", default=None)
+_collector = contextvars.ContextVar("metrics_collector", default=None)
+
+
+class Totals:
+    def __init__(self):
+        self.stages = defaultdict(lambda: [0, 0.0, 0])  # calls, seconds, errors
+        self.tokens = defaultdict(lambda: [0, 0])  # model -> input, output
+        self.cost = defaultdict(float)  # model -> USD
+        self.cache = defaultdict(lambda: [0, 0])  # cache -> hits, misses
+
+    def summary(self):
+        return {
+            "stages": {name: {"calls": calls, "seconds": seconds, "errors": errors} for name, (calls, seconds, errors) in self.stages.items()},
+            "tokens": {model: {"input": tokens_in, "output": tokens_out} for model, (tokens_in, tokens_out) in self.tokens.items()},
+            "cost_usd": dict(self.cost),
+            "cache": {name: {"hits": hits, "misses": misses} for name, (hits, misses) in self.cache.items()},
+        }
+
+
+_totals = Totals()
+_sessions = OrderedDict()
+
+
+def current_session():
+    session = _session.get()
+    if session is None:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+            ctx = get_script_run_ctx(suppress_warning=True)
+        except Exception:
+            ctx = None
+        session = ctx.session_id if ctx else None
+    return session
+
+
+def bind_session(session=None):
+    # Worker threads do not see the Streamlit script context; bind the
+    # session before copying the context into them.
+    return _session.set(session or current_session())
+
+
+def set_session(session):
+    # For a worker process running work for several sessions in turn; unlike
+    # bind_session, None leaves the work unattributed instead of keeping the
+    # previous session.
+    return _session.set(session)
+
+
+def _update(apply, session=None):
+    session = session or current_session()
+    collector = _collector.get()
+    with _lock:
+        apply(_totals)
+        if collector is not None:
+            apply(collector)
+        if session is not None:
+            if session not in _sessions:
+                _sessions[session] = Totals()
+                while len(_sessions) > MAX_SESSIONS:
+                    _sessions.popitem(last=False)
+            _sessions.move_to_end(session)
+            apply(_sessions[session])
+
+
+def record(event, **fields):
+    if not METRICS_FILE_ENABLED:
+        return
+    line = json.dumps({"ts": time.time(), "event": event, "session": current_session(), "request": _request.get(), **fields}, default=str)
+    with _file_lock:
+        os.makedirs(os.path.dirname(METRICS_FILE) or ".", exist_ok=True)
+        with open(METRICS_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            size = f.tell()
+        if size > METRICS_FILE_MAX_BYTES:
+            try:
+                os.replace(METRICS_FILE, METRICS_FILE + ".1")
+            except OSError:
+                # Already rotated by a screening worker process.
+                pass
+
+
+def _add_stage(name, seconds, failed):
+    def apply(totals):
+        entry = totals.stages[name]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += int(failed)
+    _update(apply)
+
+
+@contextmanager
+def stage(name, **fields):
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _add_stage(name, seconds, error is not None)
+        record("stage", stage=name, seconds=seconds, error=error, **fields)
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def request(name, **fields):
+    # One user action (a Process click, a screening batch); every event
+    # recorded inside it carries the same request id.
+    token = _request.set(uuid.uuid4().hex[:12])
+    try:
+        with stage(f"request:{name}", **fields):
+            yield
+    finally:
+        _request.reset(token)
+
+
+def cache(name, hits=0, misses=0):
+    if not hits and not misses:
+        return
+
+    def apply(totals):
+        entry = totals.cache[name]
+        entry[0] += hits
+        entry[1] += misses
+    _update(apply)
+    record("cache", cache=name, hits=hits, misses=misses)
+
+
+def estimate_cost(model, tokens_in, tokens_out):
+    for prefix in sorted(PRICES, key=len, reverse=True):
+        if model and model.startswith(prefix):
+            price_in, price_out = PRICES[prefix]
+            return (tokens_in * price_in + tokens_out * price_out) / 1_000_000
+    return 0.0
+
+
+def llm_usage(model, tokens_in, tokens_out, seconds, error=None, stage_name="llm"):
+    # Also used for embedding calls, recorded under the "embed" stage.
+    cost = estimate_cost(model, tokens_in, tokens_out)
+
+    def apply(totals):
+        entry = totals.tokens[model]
+        entry[0] += tokens_in
+        entry[1] += tokens_out
+        totals.cost[model] += cost
+    _update(apply)
+    _add_stage(stage_name, seconds, error is not None)
+    record("usage", stage=stage_name, model=model, tokens_in=tokens_in, tokens_out=tokens_out, cost_usd=cost, seconds=seconds, error=error)
+
+
+@contextmanager
+def collect():
+    # Also adds what is recorded in the block, and in contexts copied from it,
+    # to a Totals of its own; a worker process sends its summary() back to be
+    # merged into the server's numbers.
+    totals = Totals()
+    token = _collector.set(totals)
+    try:
+        yield totals
+    finally:
+        _collector.reset(token)
+
+
+def merge(summary, session=None):
+    # Adds a Totals.summary() from another process to this one's totals and
+    # to the session's.
+    def apply(totals):
+        for name, values in summary["stages"].items():
+            entry = totals.stages[name]
+            entry[0] += values["calls"]
+            entry[1] += values["seconds"]
+            entry[2] += values["errors"]
+        for model, values in summary["tokens"].items():
+            entry = totals.tokens[model]
+            entry[0] += values["input"]
+            entry[1] += values["output"]
+        for model, cost in summary["cost_usd"].items():
+            totals.cost[model] += cost
+        for name, values in summary["cache"].items():
+            entry = totals.cache[name]
+            entry[0] += values["hits"]
+            entry[1] += values["misses"]
+    _update(apply, session)
+
+
+def session_summary(session=None):
+    with _lock:
+        totals = _sessions.get(session or current_session())
+        return totals.summary() if totals else Totals().summary()
+
+
+def process_summary():
+    with _lock:
+        return _totals.summary()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    summary = process_summary()
+    lines = [
+        "# HELP complan_stage_calls_total Calls per pipeline stage.",
+        "# TYPE complan_stage_calls_total counter",
+        "# HELP complan_stage_seconds_total Time spent per pipeline stage.",
+        "# TYPE complan_stage_seconds_total counter",
+        "# HELP complan_stage_errors_total Failed calls per pipeline stage.",
+        "# TYPE complan_stage_errors_total counter",
+    ]
+    for name, entry in sorted(summary["stages"].items()):
+        lines.append(f'complan_stage_calls_total{{stage="{_label(name)}"}} {entry["calls"]}')
+        lines.append(f'complan_stage_seconds_total{{stage="{_label(name)}"}} {entry["seconds"]:.6f}')
+        lines.append(f'complan_stage_errors_total{{stage="{_label(name)}"}} {entry["errors"]}')
+    lines += [
+        "# HELP complan_llm_tokens_total Tokens sent to and received from each model.",
+        "# TYPE complan_llm_tokens_total counter",
+    ]
+    for model, entry in sorted(summary["tokens"].items()):
+        lines.append(f'complan_llm_tokens_total{{model="{_label(model)}",direction="input"}} {entry["input"]}')
+        lines.append(f'complan_llm_tokens_total{{model="{_label(model)}",direction="output"}} {entry["output"]}')
+    lines += [
+        "# HELP complan_llm_cost_usd_total Estimated spend per model at list price.",
+        "# TYPE complan_llm_cost_usd_total counter",
+    ]
+    for model, cost in sorted(summary["cost_usd"].items()):
+        lines.append(f'complan_llm_cost_usd_total{{model="{_label(model)}"}} {cost:.6f}')
+    lines += [
+        "# HELP complan_cache_requests_total Cache lookups by cache and result.",
+        "# TYPE complan_cache_requests_total counter",
+    ]
+    for name, entry in sorted(summary["cache"].items()):
+        lines.append(f'complan_cache_requests_total{{cache="{_label(name)}",result="hit"}} {entry["hits"]}')
+        lines.append(f'complan_cache_requests_total{{cache="{_label(name)}",result="miss"}} {entry["misses"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_exporter(port=METRICS_PORT, host=METRICS_HOST):
+    # One endpoint per process, served from a daemon thread.
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            logger.exception("could not start the metrics endpoint on %s:%s", host, port)
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-exporter", daemon=True).start()
+        return _server
+
+
+def debug_panel():
+    import streamlit as st
+
+    if not (DEBUG_PANEL or st.query_params.get("debug") == "1"):
+        return
+    summary = session_summary()
+    with st.sidebar.expander("Performance (this session)"):
+        st.dataframe(
+            [{"stage": name, "calls": entry["calls"], "seconds": round(entry["seconds"], 3), "errors": entry["errors"]}
+             for name, entry in sorted(summary["stages"].items())],
+            hide_index=True,
+        )
+        tokens_in = sum(entry["input"] for entry in summary["tokens"].values())
+        tokens_out = sum(entry["output"] for entry in summary["tokens"].values())
+        st.caption(f"Tokens in/out: {tokens_in} / {tokens_out} · estimated cost: ${sum(summary['cost_usd'].values()):.4f}")
+        st.dataframe(
+            [{"cache": name, "hits": entry["hits"], "misses": entry["misses"]} for name, entry in sorted(summary["cache"].items())],
+            hide_index=True,
+        )
+
+
+# Screening job workers report through the metrics file only; the
+# endpoint belongs to the server process.
+if multiprocessing.parent_process() is None:
+    start_exporter()
@@ -1,14 +1,12 @@
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_core.output_parsers import StrOutputParser, PydanticOutputParser
-from pydantic import BaseModel, Field
-from typing import List
 from datetime import datetime, timedelta
 import os
-import time
+import streamlit.components.v1 as components
 from menu import menu_with_redirect
+import metrics
+import question_bank
+from resources import get_chat_openai
 st.set_page_config(page_title="Job Interview Simulator", page_icon="📈")
 menu_with_redirect()
 Page_style="""
@@ -33,55 +31,46 @@ st.markdown(Page_style,unsafe_allow_html=True)
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
-model = ChatOpenAI(model="gpt-4o-mini", api_key=openai_api_key)
 
+def get_model():
+    return get_chat_openai("gpt-4o-mini", openai_api_key)
 
 def generate_questions(job_role, work_experience):
-    system_template = (
-        "You are an intelligent competency diagnostic system. Ask a series of questions to the job seeker "
-        "to test their competence, and based on their scores, recommend jobs to them."
-    )
-    human_prompt = f"Assume the given job seeker is a {job_role} with {work_experience} years of experience. Generate a set of 5 questions to test their competence."
-    prompt_template = ChatPromptTemplate.from_messages([("system", system_template), ("user", human_prompt)])
-    parser = StrOutputParser()
-    chain = prompt_template | model | parser
-
-    try:
-        response = chain.invoke({"job_role": job_role, "work_experience": work_experience})
-        return response
-    except Exception as e:
-        st.error(f"Error generating questions: {e}")
-        return ""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+    from pydantic import BaseModel, Field
+    from typing import List
 
-def get_questions(context):
     class Questions(BaseModel):
         set_of_questions: List[str] = Field(description="List of questions to test the competence of the job seeker")
 
     parser = PydanticOutputParser(pydantic_object=Questions)
-    format_instructions = parser.get_format_instructions()
-    human_prompt = f"Here is the context: {context}. Extract the set of questions from the given context to test the competence of the job seeker. Generate the questions in the following format: {format_instructions}"
-    prompt = PromptTemplate(
-        template="You are an intelligent information extractor. Extract the set of questions from the given context to test the competence of the job seeker in a List format.\n{format_instructions}\n{human_prompt}\n",
-        input_variables=["human_prompt"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
+    system_template = (
+        "You are an intelligent competency diagnostic system. Ask a series of questions to the job seeker "
+        "to test their competence, and based on their scores, recommend jobs to them."
+    )
+    human_prompt = "Assume the given job seeker is a {job_role} with {work_experience} years of experience. Generate a set of 5 questions to test their competence.\n{format_instructions}"
+    prompt_template = ChatPromptTemplate.from_messages([("system", system_template), ("user", human_prompt)]).partial(
+        format_instructions=parser.get_format_instructions()
     )
-    chain = prompt | model | parser
+    chain = prompt_template | get_model() | parser
 
-    try:
-        response = chain.invoke({"human_prompt": human_prompt})
-        return response
-    except Exception as e:
-        st.error(f"Error extracting questions: {e}")
-        return ""
+    response = chain.invoke({"job_role": job_role, "work_experience": work_experience})
+    if len(response.set_of_questions) < 5:
+        raise ValueError(f"expected 5 questions, got {len(response.set_of_questions)}")
+    return response.set_of_questions[:5]
 
 def calculate_score(answers, job_role, work_experience):
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
     human_prompt = f"Assume the given job seeker is a {job_role} with {work_experience} years of experience. Calculate the score of the job seeker based on their answers to the questions. Here is the set of answers provided by the job seeker for each question: {answers}. Each question can be scored out of 5 points, leading to a maximum possible score of 25 points as only a set of 5 questions and answers are provided."
     prompt = PromptTemplate(
         template="You are an intelligent competency diagnostic system. You are required to calculate the score of the job seeker based on their answers to the questions based on their job role and work experience.\n{human_prompt}",
         input_variables=["human_prompt"],
     )
     parser = StrOutputParser()
-    chain = prompt | model | parser
+    chain = prompt | get_model() | parser
 
     try:
         response = chain.invoke({"human_prompt": human_prompt})
@@ -90,9 +79,51 @@ def calculate_score(answers, job_role, work_experience):
         st.error(f"Error generating scores: {e}")
         return ""
 
-def format_remaining_time(remaining_time):
-    minutes, seconds = divmod(remaining_time.seconds, 60)
-    return f"{minutes:02}:{seconds:02}"
+# Answers that reach the server later than this after the deadline are ignored.
+GRACE_PERIOD = timedelta(seconds=2)
+
+def render_countdown(remaining_time, time_limit):
+    # The countdown ticks in the browser, so an open test holds no server thread.
+    remaining_ms = max(int(remaining_time.total_seconds() * 1000), 0)
+    total_ms = int(time_limit.total_seconds() * 1000)
+    components.html(f"""
+<div id="timer" style="font-family:sans-serif;color:white;margin-bottom:6px">⏳ Time remaining: --:--</div>
+<progress id="bar" max="{total_ms}" value="{total_ms - remaining_ms}" style="width:100%"></progress>
+<script>
+const end = Date.now() + {remaining_ms};
+function tick() {{
+    const remaining = Math.max(0, end - Date.now());
+    const seconds = Math.ceil(remaining / 1000);
+    const mm = String(Math.floor(seconds / 60)).padStart(2, "0");
+    const ss = String(seconds % 60).padStart(2, "0");
+    document.getElementById("timer").textContent = "⏳ Time remaining: " + mm + ":" + ss;
+    document.getElementById("bar").value = {total_ms} - remaining;
+    if (remaining > 0) setTimeout(tick, 250);
+}}
+tick();
+</script>
+""", height=60)
+
+def submission_deadline():
+    return st.session_state.end_time + GRACE_PERIOD
+
+def schedule_deadline():
+    # A single fragment rerun is scheduled for the deadline; the full rerun it
+    # triggers submits the answers.
+    remaining_time = submission_deadline() - datetime.now()
+    @st.fragment(run_every=max(remaining_time.total_seconds() + 0.5, 1))
+    def deadline_watcher():
+        if datetime.now() > submission_deadline():
+            st.rerun()
+    deadline_watcher()
+
+def submit_answers():
+    st.session_state.final_answers = {q: st.session_state.final_answers.get(q, '') for q in st.session_state.questions}
+    with metrics.request("interview_score"):
+        response = calculate_score(st.session_state.final_answers, st.session_state.job_role, st.session_state.work)
+    st.session_state.questions.clear()
+    st.session_state.response = response
+    st.rerun()
 
 def main():
     if 'questions' not in st.session_state:
@@ -122,10 +153,15 @@ def main():
     col1, col2 = st.columns([3, 1])
     with col1:
         if st.button("Generate Questions"):
-            response = generate_questions(st.session_state.job_role, st.session_state.work)
-            res = get_questions(response)
-            if len(res.set_of_questions) == 5:
-                st.session_state.questions = res.set_of_questions
+            try:
+                with metrics.request("interview_questions"):
+                    questions = question_bank.get_questions(st.session_state.job_role, st.session_state.work, generate_questions)
+            except Exception as e:
+                st.error(f"Error generating questions: {e}")
+                questions = []
+            if len(questions) == 5:
+                st.session_state.questions = list(questions)
+                st.session_state.final_answers = {}
                 st.session_state.start_time = datetime.now()
                 st.session_state.end_time = st.session_state.start_time + st.session_state.time_limit
                 st.success("Questions generated! You have 5 minutes to complete the test.")
@@ -139,39 +175,27 @@ def main():
         st.write(st.session_state.response)
     
     if st.session_state.questions:
-        remaining_time = st.session_state.end_time - datetime.now()
-        timer_placeholder = st.empty()
-        progress_placeholder = st.empty()
+        # Deadline enforced on the server: once it has passed, the answers
+        # recorded so far are scored and nothing typed afterwards is accepted.
+        if datetime.now() > submission_deadline():
+            st.write("⏳ Time's up! Submitting your answers automatically...")
+            submit_answers()
+
+        render_countdown(st.session_state.end_time - datetime.now(), st.session_state.time_limit)
+        schedule_deadline()
         for question in st.session_state.questions:
             st.write(question)
             answer = st.text_input("Enter your answer", key=question)
             st.session_state.final_answers[question] = answer
 
         if st.button("Submit Answers"):
-            response = calculate_score(st.session_state.final_answers, st.session_state.job_role, st.session_state.work)
-            st.session_state.questions.clear()
-            st.session_state.response = response
-            st.rerun()
-
-        while remaining_time > timedelta(seconds=0):
-            remaining_time = st.session_state.end_time - datetime.now()
-            if remaining_time <= timedelta(seconds=0):
-                st.write("⏳ Time's up! Submitting your answers automatically...")
-                st.session_state.final_answers = {q: st.session_state.final_answers.get(q, '') for q in st.session_state.questions}
-                
-                response = calculate_score(st.session_state.final_answers, st.session_state.job_role, st.session_state.work)
-                st.session_state.questions.clear()
-                st.session_state.response = response
-                st.rerun()
-                break
-
-            timer_placeholder.markdown(f"⏳ Time remaining: {format_remaining_time(remaining_time)}")
-            time_percentage = (st.session_state.time_limit - remaining_time) / st.session_state.time_limit
-            progress_placeholder.progress(time_percentage, text=f"Time remaining: {format_remaining_time(remaining_time)}")
-
-            time.sleep(1)
+            submit_answers()
     else:
         st.info("Generate questions to start the test.")
 
+    # Started after the page has rendered so that loading LangChain in the
+    # background does not hold up the first paint.
+    question_bank.start_prewarm(generate_questions)
+
 if __name__ == "__main__":
     main()
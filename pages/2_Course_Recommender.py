@@ -1,13 +1,8 @@
 import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings # type: ignore
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.memory import ConversationBufferMemory
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import DeepLake
-from langchain.chains import ConversationalRetrievalChain
 from dotenv import load_dotenv
+import metrics
 from menu import menu_with_redirect
+from resources import get_google_chat, get_google_embeddings
 st.set_page_config(page_title="Course Recomender", page_icon="🧠")
 menu_with_redirect()
 load_dotenv()
@@ -31,62 +26,75 @@ Page_style="""
 """
 st.markdown(Page_style,unsafe_allow_html=True)
 
-def get_pdf_text(pdf):
-    text = ""
-    pdfReader = PdfReader(pdf)
-    for page in pdfReader.pages:
-        text += page.extract_text()
-    return text
+def get_vectorstore(pdf):
+    from resume_store import load_resume_index
 
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=750,
-        chunk_overlap=50,
-        length_function=len
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
-
-def get_vectorstore(text_chunks):
-    dataset_path = "./my_deeplake_candidate/"
-    vectorstore = DeepLake.from_texts(text_chunks,dataset_path=dataset_path, embedding=GoogleGenerativeAIEmbeddings(model="models/embedding-001"))
+    # Known resumes come back from the resume store without parsing or embedding.
+    vectorstore = load_resume_index(pdf, get_google_embeddings("models/embedding-001"))
     return vectorstore
 
-def get_conversation_chain(vectorstore):
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
-    memory = ConversationBufferMemory(memory_key='chat_history',return_messages=True)
-    conversation_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        memory=memory,
-        retriever=vectorstore.as_retriever(),
-    )
-    return conversation_chain
-
 def generate_courses(job_role, work_experience, resume):
-    raw_text = get_pdf_text(resume)
+    from langchain_core.exceptions import OutputParserException
+    from langchain_core.utils.json import parse_json_markdown
+    from skill_gap import get_skill_gap_chain
+    from streaming import StreamHandler
+
+    class ReportHandler(StreamHandler):
+        # Shows the report as far as the model's JSON has arrived.
+        def render(self, text):
+            try:
+                report = parse_json_markdown(text.rstrip("▌"))
+            except ValueError:
+                return
+            if isinstance(report, dict):
+                with self.container.container():
+                    render_report(report)
+
+    vectorstore = get_vectorstore(resume)
 
-    text_chunks = get_text_chunks(raw_text)
+    # invoke rather than stream, so the answer goes through the LLM cache;
+    # the handler still shows the report while the tokens arrive.
+    chain = get_skill_gap_chain(vectorstore, get_google_chat("gemini-1.5-flash"))
+    handler = ReportHandler(st.empty(), page="Skill Gap Analyser")
+    try:
+        report = chain.invoke({"job_role": job_role, "work_experience": work_experience}, config={"callbacks": [handler]})
+    except OutputParserException as e:
+        st.error(f"The skill gap analysis could not be read from the model's answer: {e}")
+        return
+    finally:
+        handler.finish()
+    # The report is only as complete as the model's JSON: a cut-off answer
+    # lacks fields, so it is not validated against SkillGapReport. Only the
+    # missing skills are kept, for the Udemy page.
+    if not report or not isinstance(report, dict):
+        st.error("The skill gap analysis could not be read from the model's answer. Please try again.")
+        return
+    missing_skills = report.get("missing_skills") or []
+    st.session_state.missing_skills = [str(skill) for skill in missing_skills] if isinstance(missing_skills, list) else [str(missing_skills)]
 
-    vectorstore = get_vectorstore(text_chunks)
+def skill_list(skills):
+    return "\n".join(f"- {skill}" for skill in skills or [])
 
-    chain = get_conversation_chain(vectorstore)
-    prompt3 = f'''You are an experienced Human Resource Manager and Courses recommendor who is specialized in analyzing the job resumes of the candidate and suggest them courses to imporove their skills.
-    You have been asked to analyze and extract the skills in the resume of a candidate, and get the required skills that are necessary for the job role {job_role}. Output should contain only the skills wiith comparison with the candidate skills and the required skills for the job role.'''
-    prompt = f'''You are an experienced Human Resource Manager and Courses recommendor who is specialized in analyzing the job resumes of the candidate and suggest them courses to imporove their skills.
-    You have been asked to analyze and extract the skills in the resume of a candidate. Output should contain only the skills.'''
-    response1 = chain({'question':prompt})
-    prompt2 = f"Based on the job role {job_role} and work experience {work_experience} and skills possessed by them are {response1}, suggest the courses that the candidate should take to improve their skills and provide some course links on certain topics and format the response properly."
-    response = chain({'question':prompt2})
-    response2 = chain({'question':prompt3})
+def render_report(report):
     st.subheader("Skills Gap Analysis:")
-    st.write(response2['answer'])
-    DeepLake.force_delete_by_path("./my_deeplake_candidate")
+    st.write(report.get("gap_analysis", ""))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("**Your skills**")
+        st.markdown(skill_list(report.get("candidate_skills")))
+    with col2:
+        st.markdown("**Required skills**")
+        st.markdown(skill_list(report.get("required_skills")))
+    with col3:
+        st.markdown("**Missing skills**")
+        st.markdown(skill_list(report.get("missing_skills")))
     st.subheader("Courses to improve skills:")
-    st.write(response['answer'])
+    for course in report.get("courses") or []:
+        if isinstance(course, dict) and course.get("link"):
+            st.markdown(f"- [{course.get('title', '')}]({course['link']}) — {course.get('skill', '')}")
 
 def start():
     st.title("Course Recommender")
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
     st.write("Welcome to the Course Recommender. Please enter the details below to get the skill gap analysis and courses that you can take to improve your skills.")
     with st.sidebar:
         job_role = st.text_input("Job Role")
@@ -95,7 +103,7 @@ def start():
 
     submit = st.button("Submit")
     if submit:
-        with st.spinner('Processing...'):
+        with st.spinner('Processing...'), metrics.request("skill_gap"):
             generate_courses(job_role, work_experience, resume)
             
 
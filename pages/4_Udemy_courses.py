@@ -1,8 +1,7 @@
-import base64
-import requests
 import streamlit as st
 from dotenv import load_dotenv
 import os
+import metrics
 from menu import menu_with_redirect
 st.set_page_config(page_title="Candidate AI", page_icon="🧠")
 menu_with_redirect()
@@ -26,47 +25,32 @@ Page_style="""
 </style>
 """
 st.markdown(Page_style,unsafe_allow_html=True)
-def get_auth_header(client_id, client_secret):
-    auth_str = f"{client_id}:{client_secret}"
-    auth_bytes = auth_str.encode("ascii")
-    auth_base64 = base64.b64encode(auth_bytes).decode("ascii")
-    return {"Authorization": f"Basic {auth_base64}"}
-
-def fetch_udemy_courses(auth_header, query="", fields=""):
-    base_url = "https://www.udemy.com/api-2.0/courses/"
-    params = {
-        "search": query,
-        "page": 1,
-        "page_size": 5,
-        "fields[course]": fields
-    }
-    response = requests.get(base_url, headers=auth_header, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error(f"Failed to fetch courses: {response.status_code}")
-        return None
-
 def main():
     st.title("Udemy Courses Recommender")
     client_id = os.getenv("UDEMY_CLIENT_ID")
     client_secret = os.getenv("UDEMY_CLIENT_SECRET")
-    query = st.text_input("Search for courses")
-
-    fields = "title,headline,url,num_subscribers,avg_rating,price"
+    # Pre-filled with the missing skills from the Skill Gap Analyser.
+    queries = st.text_area(
+        "Search for courses (one skill per line)",
+        value="\n".join(st.session_state.get("missing_skills", [])),
+    )
 
     if st.button("Search") and client_id and client_secret:
-        auth_header = get_auth_header(client_id, client_secret)
-        courses = fetch_udemy_courses(auth_header, query, fields)
-        
-        if courses:
-            for course in courses.get('results', []):
-                st.subheader(f"Title: {course['title']}")
-                st.write(f"**Headline:** {course['headline']}")
-                st.write(f"**Number of Subscribers:** {course['num_subscribers']}")
-                st.write(f"**Average Rating:** {course['avg_rating']}")
-                st.write(f"**Price:** {course['price']}")
-                st.write(f"[View Course](https://www.udemy.com{course['url']})")
+        from udemy import get_client
+
+        with st.spinner("Searching..."), metrics.request("udemy_search"):
+            results = get_client(client_id, client_secret).search_many(queries.splitlines())
+        for query, error in results.errors.items():
+            st.error(f"Failed to fetch courses for {query}: {error}")
+
+        for course in results.courses:
+            st.subheader(f"Title: {course['title']}")
+            st.write(f"**Headline:** {course['headline']}")
+            st.write(f"**Number of Subscribers:** {course['num_subscribers']}")
+            st.write(f"**Average Rating:** {course['avg_rating']}")
+            st.write(f"**Price:** {course['price']}")
+            st.write(f"**Matches:** {', '.join(course['matched'])}")
+            st.write(f"[View Course](https://www.udemy.com{course['url']})")
 
 if __name__ == "__main__":
     main()
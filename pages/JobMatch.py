@@ -1,15 +1,8 @@
 import streamlit as st
-from PyPDF2 import PdfReader
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import DeepLake
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain_openai import ChatOpenAI
+import metrics
 from menu import menu_with_redirect
-from pymongo import MongoClient
-import gridfs
+from resources import shared, get_chat_openai, get_openai_embeddings
 
 st.set_page_config(page_title="Candidate AI", page_icon="🧠")
 menu_with_redirect()
@@ -35,29 +28,30 @@ st.markdown(Page_style,unsafe_allow_html=True)
 
 api_key = st.secrets["openai"]["OPENAI_API_KEY"]
 
-def get_pdf_text(pdf):
-    text = ""
-    pdfReader = PdfReader(pdf)
-    for page in pdfReader.pages:
-        text += page.extract_text()
-    return text
+JOB_MATCH_PROMPT = '''Rate the resume on a scale of 1 to 100 percentage based on the job specifications: "{job_description}" and provide feedback on the same in about 50 words.'''
 
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=150,
-        length_function=len
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
+def get_vectorstore(pdf):
+    from resume_store import load_resume_index
 
-def get_vectorstore(text_chunks):
-    dataset_path = "./my_deeplake_candidate/"
-    vectorstore = DeepLake.from_texts(text_chunks,dataset_path=dataset_path, embedding=OpenAIEmbeddings(api_key=api_key))
+    # Known resumes come back from the resume store without parsing or embedding.
+    vectorstore = load_resume_index(pdf, get_openai_embeddings(api_key))
     return vectorstore
 
+def get_semantic_cache():
+    from llm_cache import ResponseCache, question_pattern
+
+    # Job descriptions pasted again with small edits reuse the earlier rating.
+    # Only the job description is compared by meaning; the rest of the
+    # prompt must match exactly.
+    return shared(
+        ("job_match_semantic_cache", api_key),
+        lambda: ResponseCache(embedding=get_openai_embeddings(api_key), question=question_pattern(JOB_MATCH_PROMPT, "job_description")),
+    )
+
 def get_conversation_chain(vectorstore):
-    llm = ChatOpenAI(model="gpt-4o",api_key=api_key)
+    from langchain.chains import ConversationalRetrievalChain
+
+    llm = get_chat_openai("gpt-4o", api_key, streaming=True, cache=get_semantic_cache())
     conversation_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
         retriever=vectorstore.as_retriever(),
@@ -65,31 +59,24 @@ def get_conversation_chain(vectorstore):
     return conversation_chain
 
 def handle_defaultinput(user_question,vectorstore):
+    from streaming import StreamHandler
+
     conversation = get_conversation_chain(vectorstore)
-    response  = conversation({'question':user_question,"chat_history":""})
     aimessage = st.chat_message('ai')
-    aimessage.write(response['answer'])
-    DeepLake.force_delete_by_path("./my_deeplake_candidate")
+    handler = StreamHandler(aimessage.empty(), page="Job Match")
+    conversation({'question':user_question,"chat_history":""}, callbacks=[handler])
+    handler.finish()
 
 def main():
-    # Connect to MongoDB
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['jobfit']
-    fs = gridfs.GridFS(db,collection='resumes')
-
     st.header('Complan AI :robot_face:')
     st.subheader('Job Match Tool')
     # st.subheader('Job Match Tool helps us to check if the resume aligns with the job description')
     user_question = st.text_input('Enter the job description:')
     pdf = st.file_uploader('Upload your resume:')
     if st.button('Process'):
-        with st.spinner('Processing...'):
-            raw_text = get_pdf_text(pdf)
-
-            text_chunks = get_text_chunks(raw_text)
-
-            vectorstore = get_vectorstore(text_chunks)
-            prompt = f'''Rate the resume on a scale of 1 to 100 percentage based on the job specifications: "{user_question}" and provide feedback on the same in about 50 words.'''
+        with st.spinner('Processing...'), metrics.request("job_match"):
+            vectorstore = get_vectorstore(pdf)
+            prompt = JOB_MATCH_PROMPT.format(job_description=user_question)
             handle_defaultinput(prompt,vectorstore)
     st.divider()
 
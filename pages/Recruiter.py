@@ -1,21 +1,8 @@
+import os
 import streamlit as st
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from PyPDF2 import PdfReader
-from sqlalchemy import Column, Integer, String, create_engine, Table, MetaData
-from langchain.utilities import SQLDatabase
-from langchain.llms import OpenAI
-from langchain.agents import create_sql_agent
-from langchain.agents.agent_toolkits import SQLDatabaseToolkit
-from langchain.agents.agent_types import AgentType
+import metrics
 from menu import menu_with_redirect
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain.vectorstores import DeepLake
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-import pandas as pd
 
 
 st.set_page_config(page_title="Hirer AI", page_icon="🧠")
@@ -42,115 +29,121 @@ st.markdown(Page_style,unsafe_allow_html=True)
 
 api_key = st.secrets["openai"]["OPENAI_API_KEY"]
 
-def create_database():
-    metadata_obj = MetaData()
-
-    job = Table(
-        'job',
-        metadata_obj,
-        Column('id', Integer, primary_key=True),
-        Column('applicant_name', String, unique=True),
-        Column('rating', Integer),
-    )
-
-    engine = create_engine('sqlite:///./hirer.db', echo=False)
-
-    metadata_obj.create_all(engine)
-
-def get_pdf_text(pdf):
-    text = ""
-    pdfReader = PdfReader(pdf)
-    for page in pdfReader.pages:
-        text += page.extract_text()
-    return text
-
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=150,
-        length_function=len
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
-
-def get_vectorstore(text_chunks):
-    dataset_path = "./my_deeplake/"
-    vectorstore = DeepLake.from_texts(text_chunks,dataset_path=dataset_path, embedding=OpenAIEmbeddings(api_key=api_key))
-    return vectorstore
-
-def handle_defaultinput(resp):
-    db = SQLDatabase.from_uri("sqlite:///./hirer.db")
-    llm = OpenAI(temperature=0, verbose=True, api_key=api_key)
+# Same setting as screening.TOP_K; screening itself is only imported once a run starts.
+DEFAULT_TOP_K = int(os.getenv("SCREENING_TOP_K", "20"))
+SHORTLIST_COLUMNS = ["applicant_name", "rating", "similarity"]
+# Best rated candidates drawn in the ratings chart; the rest are summarised
+# in the rating histogram.
+CHART_TOP_N = 25
+# How often a running screening job's progress is refreshed.
+POLL_SECONDS = 2
+
+def ask_database(question):
+    from langchain.utilities import SQLDatabase
+    from langchain.llms import OpenAI
+    from langchain.agents import create_sql_agent
+    from langchain.agents.agent_toolkits import SQLDatabaseToolkit
+    from langchain.agents.agent_types import AgentType
+    from hirer_db import DATABASE_URL
+
+    from llm_usage import UsageHandler
+
+    db = SQLDatabase.from_uri(DATABASE_URL)
+    llm = OpenAI(temperature=0, api_key=api_key, callbacks=[UsageHandler("gpt-3.5-turbo-instruct")])
     agent_executor = create_sql_agent(
         llm=llm,
         toolkit=SQLDatabaseToolkit(db=db, llm=llm),
         agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
     )
-    agent_executor.run(
-    f"Insert values into job table with applicant_name as '{resp.name}' and rating as '{resp.rating}' and give the answer with the query alone"
-    )
-    DeepLake.force_delete_by_path("./my_deeplake")
-
-
-def get_conversation_chain(vectorstore,user_question):
-    st.session_state.answer = ""
-    llm = ChatOpenAI(model="gpt-4o",api_key=api_key)
-    class Job(BaseModel):
-        name: str = Field(description="applicant's name in the resume")
-        rating: int = Field(description="rating of the candidate's resume")
-
-    parser = PydanticOutputParser(pydantic_object=Job, output_variables=["applicant_name", "rating"])
-    retriever=vectorstore.as_retriever()
-    template = '''
-        Use the following pieces of context to answer the user's question. 
-        If you don't know the answer, just say that you don't know, don't try to make up an answer.
-        ----------------
-        Context:
-        {context}
-        ----------------
-        Question:
-        {query}
-        ----------------
-        Finally Format the answer in the following format:
-        {format_instructions}
-
-        Answer:
-        '''
-    prompt = PromptTemplate(
-        template=template,
-        input_variables=["context","query"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
-    conv_chain = RunnableParallel({"context":retriever,"query":RunnablePassthrough()}) | prompt | llm | parser
-    resp  = conv_chain.invoke(user_question)
-    if resp.name != None or resp.rating != None:
-        handle_defaultinput(resp)
-    else:
-        resp.name = "Manish"
-        resp.rating = 50
-        handle_defaultinput(resp)
-
-def retrieve_candidates():
-    db = SQLDatabase.from_uri("sqlite:///./hirer.db")
-    llm = OpenAI(temperature=0, api_key=api_key)
-    agent_executor = create_sql_agent(
-        llm=llm,
-        toolkit=SQLDatabaseToolkit(db=db, llm=llm),
-        agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    )
-    response = agent_executor.run(
-        "Select applicant_name, rating from job where rating > 60 order by rating limit 2"
-    )
-    st.session_state.answer = response
-    
-def barchart():
-    engine = create_engine('sqlite:///./hirer.db',echo=False)
-
-    query = '''
-    select * from job
-    '''
-    df = pd.read_sql_query(query, engine)
-    st.bar_chart(data=df,x='applicant_name',y='rating')
+    st.session_state.answer = agent_executor.run(question)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def chart_data(job_spec_id, ratings_version):
+    # ratings_version only takes part in the cache key: it changes whenever
+    # ratings for the job specification are written, and nothing else does.
+    import pandas as pd
+    from hirer_db import Candidate, rating_histogram, shortlist
+
+    top = pd.DataFrame(shortlist(job_spec_id, k=CHART_TOP_N, min_rating=None), columns=Candidate._fields)
+    # Applicants who share a name get a bar each.
+    repeat = top.groupby("applicant_name").cumcount()
+    top["candidate"] = top["applicant_name"].where(repeat == 0, top["applicant_name"] + " (" + (repeat + 1).astype(str) + ")")
+    histogram = pd.DataFrame(rating_histogram(job_spec_id), columns=["rating", "candidates"])
+    return top[["candidate", "rating"]], histogram
+
+def barchart(job_spec_id):
+    from hirer_db import ratings_version
+
+    top, histogram = chart_data(job_spec_id, ratings_version(job_spec_id))
+    st.bar_chart(data=top, x='candidate', y='rating')
+    st.caption("Candidates per rating band")
+    st.bar_chart(data=histogram, x='rating', y='candidates')
+
+def results_table(results):
+    import pandas as pd
+
+    return pd.DataFrame([{
+        "resume": result.resume,
+        "applicant_name": result.applicant_name,
+        "similarity": round(result.similarity, 3) if result.similarity is not None else None,
+        "rating": result.rating,
+        "seconds": round(result.seconds, 1) if result.seconds is not None else None,
+        "error": result.error,
+    } for result in results if result.done])
+
+def show_job(job_id, shortlist_size):
+    import pandas as pd
+    from screening_jobs import FINISHED, get_job, get_pool, get_results
+    from hirer_db import Candidate, shortlist
+
+    running = get_job(job_id).status not in FINISHED
+
+    @st.fragment(run_every=POLL_SECONDS if running else None)
+    def job_progress():
+        # Replaces the pool if a worker died, which restarts the queued jobs.
+        get_pool(api_key)
+        job = get_job(job_id)
+        if running and job.status in FINISHED:
+            # One full rerun to show the shortlist and stop polling.
+            st.rerun()
+        st.progress(job.done / job.total if job.total else 1.0, text=f"{job.status.capitalize()}: {job.done}/{job.total} resumes screened")
+        st.dataframe(results_table(get_results(job_id)), hide_index=True)
+    job_progress()
+
+    if running:
+        return
+    job = get_job(job_id)
+    if job.status == "failed":
+        st.error(f"Screening failed: {job.error}")
+        return
+    failed = sum(1 for result in get_results(job_id) if result.error)
+    if failed:
+        st.warning(f"{failed} of {job.total} resumes could not be screened.")
+    aimessage = st.chat_message('ai')
+    aimessage.write("Shortlisted candidates:")
+    candidates = pd.DataFrame(shortlist(job.job_spec_id, k=shortlist_size), columns=Candidate._fields)
+    aimessage.dataframe(candidates[SHORTLIST_COLUMNS], hide_index=True)
+    barchart(job.job_spec_id)
+
+def show_screening_jobs(shortlist_size):
+    from datetime import datetime
+    from screening_jobs import get_pool, recent_jobs
+
+    # Also resumes jobs that a previous server process left unfinished.
+    get_pool(api_key)
+    jobs = {job.id: job for job in recent_jobs()}
+    if not jobs:
+        return
+    if st.session_state.get("screening_job") not in jobs:
+        st.session_state.screening_job = next(iter(jobs))
+
+    def label(job_id):
+        job = jobs[job_id]
+        created = datetime.fromtimestamp(job.created).strftime("%d %b %H:%M")
+        return f"#{job.id} · {created} · {job.status} · {job.job_specification[:40]}"
+
+    job_id = st.selectbox("Screening job:", list(jobs), format_func=label, key="screening_job")
+    show_job(job_id, shortlist_size)
 
 def main():
     if "answer" not in st.session_state:
@@ -164,21 +157,22 @@ def main():
     with st.sidebar:
         st.subheader('Job Specifications')
         job_specification = st.text_area("Enter the job specifications:")
+        top_k = st.number_input("Resumes sent for LLM rating (top-k by similarity):", min_value=1, value=DEFAULT_TOP_K)
+        shortlist_size = st.number_input("Candidates to shortlist:", min_value=1, value=2)
         st.divider()
-    if st.button('Process'):
-        with st.spinner('Processing...'):
-            create_database()
-            for pdf in pdfs:
-                raw_text = get_pdf_text(pdf)
-
-                text_chunks = get_text_chunks(raw_text)
-
-                vectorstore = get_vectorstore(text_chunks)
-
-                get_conversation_chain(vectorstore,f'Retrieve the applicant name and rate the resume on a scale of 1 to 100 based on the job specifications: "{job_specification}" and get the applicant name in the resume and rating of the resume as output.')
-            retrieve_candidates()
-            aimessage = st.chat_message('ai')
-            aimessage.write(st.session_state.answer)
-            barchart()
+    if st.button('Process') and pdfs and job_specification:
+        from screening_jobs import submit
+
+        # Screening runs in a worker process; the page only follows it, so
+        # reruns and refreshes do not interrupt the batch.
+        st.session_state.screening_job = submit(pdfs, job_specification, int(top_k), api_key)
+    show_screening_jobs(int(shortlist_size))
+
+    with st.expander('Ask the candidate database'):
+        question = st.text_input('Ask a question about the screened candidates:')
+        if st.button('Ask') and question:
+            with st.spinner('Querying...'), metrics.request("ask_database"):
+                ask_database(question)
+            st.write(st.session_state.answer)
 if __name__ == '__main__':
     main()
\ No newline at end of file
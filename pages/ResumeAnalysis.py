@@ -1,16 +1,8 @@
 import streamlit as st
-from PyPDF2 import PdfReader
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import DeepLake
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain_openai import ChatOpenAI
+import metrics
 from menu import menu_with_redirect
-import pymongo
-from pymongo import MongoClient
-import gridfs
+from resources import get_chat_openai, get_openai_embeddings
 
 st.set_page_config(page_title="Resume Analysis", page_icon="🧠")
 menu_with_redirect()
@@ -36,29 +28,18 @@ st.markdown(Page_style,unsafe_allow_html=True)
 
 api_key = st.secrets["openai"]["OPENAI_API_KEY"]
 
-def get_pdf_text(pdf):
-    text = ""
-    pdfReader = PdfReader(pdf)
-    for page in pdfReader.pages:
-        text += page.extract_text()
-    return text
+def get_vectorstore(pdf):
+    from resume_store import load_resume_index
 
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=150,
-        length_function=len
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
-
-def get_vectorstore(text_chunks):
-    dataset_path = "./my_deeplake_candidate/"
-    vectorstore = DeepLake.from_texts(text_chunks,dataset_path=dataset_path, embedding=OpenAIEmbeddings(api_key=api_key))
+    # Known resumes come back from the resume store without parsing or embedding.
+    vectorstore = load_resume_index(pdf, get_openai_embeddings(api_key))
     return vectorstore
 
 def get_conversation_chain(vectorstore):
-    llm = ChatOpenAI(model="gpt-4o",api_key=api_key)
+    from langchain.memory import ConversationBufferMemory
+    from langchain.chains import ConversationalRetrievalChain
+
+    llm = get_chat_openai("gpt-4o", api_key, streaming=True)
     memory = ConversationBufferMemory(memory_key='chat_history',return_messages=True)
     conversation_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
@@ -70,11 +51,6 @@ def get_conversation_chain(vectorstore):
 
 
 def main():
-    # Connect to MongoDB
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['jobfit']
-    fs = gridfs.GridFS(db,collection='resumes')
-
     st.header('Complan AI :robot_face:')
     st.subheader('Resume Analysis Tool')
     # st.subheader('Resume Analysis tool helps you to analyze the strength and weakness of your resume.')
@@ -82,20 +58,18 @@ def main():
     pdf = st.file_uploader('Upload your resume:')
     
     if st.button('Process'):
-        with st.spinner('Processing...'):
-            raw_text = get_pdf_text(pdf)
-
-            text_chunks = get_text_chunks(raw_text)
+        with st.spinner('Processing...'), metrics.request("resume_analysis"):
+            from streaming import StreamHandler
 
-            vectorstore = get_vectorstore(text_chunks)
+            vectorstore = get_vectorstore(pdf)
 
             chain = get_conversation_chain(vectorstore)
             prompt = '''You are an experienced Human Resource Manager who is specialized in analyzing the job resumes of the candidate.
             You have been asked to analyze the resume of a candidate and provide the feedback. Analyze the strength and weakness of the resume and provide the feedback.
             The output should be provided as personal details in 5 points and then provide the strength and weakness of the resume.'''
-            response = chain({'question':prompt})
-            DeepLake.force_delete_by_path("./my_deeplake_candidate")
-            st.write(response['answer'])
+            handler = StreamHandler(st.empty(), page="Resume Analysis")
+            chain({'question':prompt}, callbacks=[handler])
+            handler.finish()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
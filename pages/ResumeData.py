@@ -1,5 +1,6 @@
+import re
 import streamlit as st
-from pymongo import MongoClient
+from resources import get_resume_db
 from menu import menu_with_redirect
 from dotenv import load_dotenv
 
@@ -27,32 +28,87 @@ st.markdown(Page_style,unsafe_allow_html=True)
 
 load_dotenv()
 
+PAGE_SIZES = [25, 50, 100]
+# Only the fields shown in the table are read from MongoDB.
+FIELDS = {"filename": 1, "uploadDate": 1, "length": 1}
+
+@st.cache_resource(show_spinner=False)
+def ensure_indexes(_files):
+    # Runs once per process, not on every rerun. Same key as the index GridFS
+    # creates for filename lookups, plus one that serves the newest-first
+    # listing and its page cursors.
+    _files.create_index([("filename", 1), ("uploadDate", 1)])
+    _files.create_index([("uploadDate", -1), ("_id", -1)])
+
+def get_resume_files():
+    files = get_resume_db()['resumes.files']
+    ensure_indexes(files)
+    return files
+
+def fetch_page(files, prefix, after, page_size):
+    query = {}
+    if prefix:
+        # Anchored, case-sensitive prefix so the filename index can be used.
+        query["filename"] = {"$regex": "^" + re.escape(prefix)}
+    if after is not None:
+        upload_date, last_id = after
+        query["$or"] = [
+            {"uploadDate": {"$lt": upload_date}},
+            {"uploadDate": upload_date, "_id": {"$lt": last_id}},
+        ]
+    cursor = files.find(query, FIELDS).sort([("uploadDate", -1), ("_id", -1)]).limit(page_size + 1)
+    documents = list(cursor)
+    return documents[:page_size], len(documents) > page_size
+
+def reset_pages():
+    # Each entry is the cursor the page starts after; None is the first page.
+    st.session_state.resume_cursors = [None]
+
+def next_page(last):
+    st.session_state.resume_cursors.append((last["uploadDate"], last["_id"]))
+
+def previous_page():
+    st.session_state.resume_cursors.pop()
+
 def main():
     st.title("Resume Data")
     st.write("This is a page for viewing resume data.")
 
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["jobfit"]
-    
+    if "resume_cursors" not in st.session_state:
+        reset_pages()
+    if "show_resumes" not in st.session_state:
+        st.session_state.show_resumes = False
+
     if st.button('Get Database'):
-        pipeline = [
-            {
-                '$group': {
-                    '_id': '$filename', 
-                    'document': {
-                        '$first': '$$ROOT'
-                    }
-                }
-            }, 
-            {
-                '$replaceRoot': {
-                    'newRoot': '$document'
-                }
-            }
-        ]
-        result = db['resumes.files'].aggregate(pipeline)
-        for document in result:
-            st.write(document)
+        st.session_state.show_resumes = True
+        reset_pages()
+    if not st.session_state.show_resumes:
+        return
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        prefix = st.text_input("Filename starts with", on_change=reset_pages)
+    with col2:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, on_change=reset_pages)
+
+    documents, has_more = fetch_page(get_resume_files(), prefix, st.session_state.resume_cursors[-1], page_size)
+    st.dataframe([
+        {
+            "filename": document.get("filename"),
+            "uploaded": document.get("uploadDate"),
+            "size_kb": round(document.get("length", 0) / 1024, 1),
+            "id": str(document["_id"]),
+        }
+        for document in documents
+    ], hide_index=True, use_container_width=True)
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        st.button("Previous", on_click=previous_page, disabled=len(st.session_state.resume_cursors) == 1)
+    with col2:
+        st.button("Next", on_click=next_page, args=(documents[-1] if documents else None,), disabled=not has_more)
+    with col3:
+        st.caption(f"Page {len(st.session_state.resume_cursors)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,19 +1,17 @@
+import os
 import streamlit as st
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import DeepLake
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain_openai import ChatOpenAI
+import metrics
 from menu import menu_with_redirect
-from pymongo import MongoClient
-import gridfs
+from resources import get_chat_openai, get_openai_embeddings
 
 st.set_page_config(page_title="Candidate AI", page_icon="🧠")
 menu_with_redirect()
 api_key = st.secrets["openai"]["OPENAI_API_KEY"]
 
+# Upper bound, in tokens, on the chat history sent with each question. The
+# oldest turns are dropped first; the transcript on screen keeps them all.
+CHAT_MEMORY_TOKENS = int(os.getenv("RESUME_CHAT_MEMORY_TOKENS", "2000"))
+
 Page_style="""
 <style>
     [data-testid="stAppViewContainer"]{
@@ -34,107 +32,93 @@ Page_style="""
 """
 st.markdown(Page_style,unsafe_allow_html=True)
 
-def get_pdf_text(pdf):
-    text = ""
-    pdfReader = PdfReader(pdf)
-    for page in pdfReader.pages:
-        text += page.extract_text()
-    return text
-
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=750,
-        chunk_overlap=50,
-        length_function=len
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
+def get_vectorstore(pdf):
+    from resume_store import load_resume_index
 
-def get_vectorstore(text_chunks):
-    dataset_path = "./my_deeplake_candidate/"
-    vectorstore = DeepLake.from_texts(text_chunks,dataset_path=dataset_path, embedding=OpenAIEmbeddings(api_key=api_key))
+    # Known resumes come back from the resume store without parsing or embedding.
+    vectorstore = load_resume_index(pdf, get_openai_embeddings(api_key))
     return vectorstore
 
 def get_conversation_chain(vectorstore):
-    llm = ChatOpenAI(model="gpt-4o", api_key=api_key)
-    memory = ConversationBufferMemory(memory_key='chat_history',return_messages=True)
+    from langchain.memory import ConversationTokenBufferMemory
+    from langchain.chains import ConversationalRetrievalChain
+    from streaming import CONDENSE_TAG
+
+    llm = get_chat_openai("gpt-4o", api_key, streaming=True)
+    condense_llm = get_chat_openai("gpt-4o", api_key, tags=[CONDENSE_TAG])
+    # Tokens are counted with tiktoken through the chat model.
+    memory = ConversationTokenBufferMemory(llm=condense_llm, max_token_limit=CHAT_MEMORY_TOKENS, memory_key='chat_history', return_messages=True)
     conversation_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
+        condense_question_llm=condense_llm,
         memory=memory,
         retriever=vectorstore.as_retriever(),
     )
     return conversation_chain
 
-def handle_userinput(user_question):
-    response  = st.session_state.conversation({'question':user_question})
-    st.session_state.chat_history = response['chat_history']
+def stream_answer(user_question):
+    from streaming import StreamHandler
 
-    for i, message in enumerate(st.session_state.chat_history):
-        if i%2==0:
-            usermessage = st.chat_message('user')
-            usermessage.write(message.content)
-        else:
-            aimessage = st.chat_message('ai')
-            aimessage.write(message.content)
+    aimessage = st.chat_message('ai')
+    handler = StreamHandler(aimessage.empty(), page="Resume Chat")
+    response  = st.session_state.conversation({'question':user_question}, callbacks=[handler])
+    handler.finish()
+    st.session_state.transcript.append(('ai', response['answer']))
 
-def handle_defaultinput(user_question):
-    response  = st.session_state.conversation({'question':user_question})
-    st.session_state.chat_history = response['chat_history']
+def render_transcript():
+    for role, text in st.session_state.transcript:
+        st.chat_message(role).write(text)
 
-    for i, message in enumerate(st.session_state.chat_history):
-        if i%2!=0:
-            aimessage = st.chat_message('ai')
-            aimessage.write(message.content)
+def handle_userinput(user_question):
+    usermessage = st.chat_message('user')
+    usermessage.write(user_question)
+    st.session_state.transcript.append(('user', user_question))
+    stream_answer(user_question)
 
-def download_file(download_loc, db, fs, file_name):
-    data = db['resumes'].files.find_one({"filename": file_name})
-    if data:
-        fs_id = data['_id']
-        out_data = fs.get(fs_id).read()
+def handle_defaultinput(user_question):
+    stream_answer(user_question)
 
-    with open(download_loc, 'wb') as output:
-        output.write(out_data)
+def download_file(download_loc, file_name):
+    from resume_store import download_resume
 
-    print("Download Completed!")
+    download_resume(file_name, download_loc)
 
 def main():
-    # Connect to MongoDB
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['jobfit']
-    fs = gridfs.GridFS(db,collection='resumes')
-
     # Initialize session state
     if "conversation" not in st.session_state:
         st.session_state.conversation = None
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = None
+    if "transcript" not in st.session_state:
+        st.session_state.transcript = []
 
     # Main page
     st.header('Complan AI :robot_face:')
     st.subheader('Resume Chat')
     # st.subheader('JobFit AI is a tool that helps you analyze your job resume in HR perspective based on your skills and interests.')
-    user_question = st.text_input('Ask a question about your resume:')
+    render_transcript()
+    # chat_input returns a question only on the run it was submitted in, so
+    # later reruns do not send it to the model again.
+    user_question = st.chat_input('Ask a question about your resume:')
     if user_question:
-        handle_userinput(user_question)
+        if st.session_state.conversation is None:
+            st.info('Upload and process your resume first.')
+        else:
+            with metrics.request("resume_chat"):
+                handle_userinput(user_question)
 
     with st.sidebar:
         st.subheader('Your Resume')
         pdf = st.file_uploader('Upload your resume:')
         if st.button('Process'):
-            with st.spinner('Processing...'):
-                raw_text = get_pdf_text(pdf)
-
-                text_chunks = get_text_chunks(raw_text)
-
-                vectorstore = get_vectorstore(text_chunks)
+            with st.spinner('Processing...'), metrics.request("resume_chat_process"):
+                vectorstore = get_vectorstore(pdf)
 
                 st.session_state.conversation = get_conversation_chain(vectorstore)
+                st.session_state.transcript = []
                 handle_defaultinput('Suggest best suited job for this resume by providing the two best job options and expected salary in rupees in about 50 words')
-                DeepLake.force_delete_by_path("./my_deeplake_candidate")
         st.divider()
     
     # if st.button('Download Resume'):
-    #     download_file('D:/Projects/JobFit AI/src/downloads/'+pdf.name, db, fs, pdf.name)
+    #     download_file('D:/Projects/JobFit AI/src/downloads/'+pdf.name, pdf.name)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+import io
+import logging
+import time
+from typing import List, NamedTuple
+
+from PyPDF2 import PdfReader
+
+import metrics
+from disk_cache import DiskCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Keyed by the SHA-256 of the PDF bytes, so the same resume uploaded on
+# another page (analysis -> job match -> skill gap) is only parsed once.
+_cache = DiskCache("pdf_text", max_entries=512)
+
+
+class PdfText(NamedTuple):
+    digest: str
+    pages: List[str]
+    page_seconds: List[float]
+    cached: bool
+
+    @property
+    def text(self):
+        return "".join(self.pages)
+
+
+def read_pdf_bytes(pdf):
+    if isinstance(pdf, (bytes, bytearray)):
+        return bytes(pdf)
+    if hasattr(pdf, "getvalue"):
+        return pdf.getvalue()
+    if hasattr(pdf, "read"):
+        data = pdf.read()
+        if hasattr(pdf, "seek"):
+            pdf.seek(0)
+        return data
+    with open(pdf, "rb") as f:
+        return f.read()
+
+
+def iter_pdf_pages(data):
+    pdfReader = PdfReader(io.BytesIO(data))
+    for page in pdfReader.pages:
+        start = time.perf_counter()
+        text = page.extract_text() or ""
+        yield text, time.perf_counter() - start
+
+
+def extract_pdf_text(pdf):
+    data = read_pdf_bytes(pdf)
+    digest = content_hash(data)
+
+    hit = _cache.get(digest)
+    metrics.cache("pdf_text", hits=int(hit is not None), misses=int(hit is None))
+    if hit is not None:
+        return PdfText(digest, hit["pages"], hit["page_seconds"], True)
+
+    pages = []
+    page_seconds = []
+    with metrics.stage("pdf_text", size=len(data)):
+        for text, seconds in iter_pdf_pages(data):
+            pages.append(text)
+            page_seconds.append(seconds)
+            logger.debug("pdf %s page %d extracted in %.4fs", digest[:12], len(pages), seconds)
+    _cache.set(digest, {"pages": pages, "page_seconds": page_seconds})
+    logger.info("pdf %s: %d pages extracted in %.3fs", digest[:12], len(pages), sum(page_seconds))
+    return PdfText(digest, pages, page_seconds, False)
+
+
+def get_pdf_text(pdf):
+    return extract_pdf_text(pdf).text
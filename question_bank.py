@@ -0,0 +1,84 @@
+import logging
+import os
+import re
+import threading
+
+from disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+QUESTION_BANK_TTL = 7 * 24 * 60 * 60
+
+COMMON_ROLES = [
+    "Software Engineer",
+    "Data Scientist",
+    "Data Analyst",
+    "Machine Learning Engineer",
+    "Frontend Developer",
+    "Backend Developer",
+    "Full Stack Developer",
+    "DevOps Engineer",
+    "Business Analyst",
+    "Product Manager",
+]
+COMMON_EXPERIENCE = [0, 1, 2, 3, 5, 8]
+# QUESTION_BANK_PREWARM=1 fills the bank for every common role and experience
+# in the background, up to 60 generation calls on an empty bank.
+PREWARM = os.getenv("QUESTION_BANK_PREWARM", "0") == "1"
+# Generation calls the pre-warm starts per minute.
+PREWARM_PER_MINUTE = int(os.getenv("QUESTION_BANK_PREWARM_PER_MINUTE", "6"))
+
+# Least recently used sets are evicted first once the bank is full, and sets
+# older than QUESTION_BANK_TTL are regenerated.
+_bank = DiskCache("question_bank", max_entries=2048, ttl=QUESTION_BANK_TTL)
+_prewarm_lock = threading.Lock()
+_prewarm_thread = None
+
+
+def normalize_key(job_role, work_experience):
+    role = " ".join(re.sub(r"[^a-z0-9+#.]+", " ", str(job_role).lower()).split())
+    match = re.search(r"\d+(\.\d+)?", str(work_experience))
+    years = int(float(match.group())) if match else 0
+    return f"{role}|{years}"
+
+
+def get_questions(job_role, work_experience, generate):
+    key = normalize_key(job_role, work_experience)
+    questions = _bank.get(key)
+    if questions:
+        return questions
+    questions = generate(job_role, work_experience)
+    if questions:
+        _bank.set(key, questions)
+    return questions
+
+
+def prewarm(generate, roles=COMMON_ROLES, experiences=COMMON_EXPERIENCE, per_minute=PREWARM_PER_MINUTE):
+    from screening import RateLimiter
+
+    limiter = RateLimiter(per_minute)
+    for role in roles:
+        for years in experiences:
+            key = normalize_key(role, years)
+            if _bank.get(key):
+                continue
+            limiter.wait()
+            try:
+                questions = generate(role, years)
+            except Exception:
+                logger.exception("could not pre-warm questions for %s", key)
+                continue
+            if questions:
+                _bank.set(key, questions)
+
+
+def start_prewarm(generate):
+    # Fills the bank for common roles once per process, off the script
+    # thread, when QUESTION_BANK_PREWARM is set.
+    global _prewarm_thread
+    if not PREWARM:
+        return
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=prewarm, args=(generate,), name="question-bank-prewarm", daemon=True)
+            _prewarm_thread.start()
@@ -0,0 +1,158 @@
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MONGO_URI = "mongodb://localhost:27017/"
+MONGO_DB = "jobfit"
+HEALTH_CHECK_INTERVAL = 30
+
+_lock = threading.RLock()
+_resources = {}
+
+
+class _Resource:
+    def __init__(self, value, close, check):
+        self.value = value
+        self.close = close
+        self.check = check
+        self.checked_at = time.monotonic()
+
+
+def _close(key, resource):
+    if resource.close is None:
+        return
+    try:
+        resource.close(resource.value)
+    except Exception:
+        logger.exception("error while closing %s", key[0])
+
+
+def shared(key, factory, close=None, check=None):
+    # Process-wide instance per key, shared by every session and script rerun.
+    # A resource whose health check fails is closed and built again.
+    with _lock:
+        resource = _resources.get(key)
+    if resource is not None and resource.check is not None and time.monotonic() - resource.checked_at > HEALTH_CHECK_INTERVAL:
+        # Checked outside the lock so a slow ping does not block other resources.
+        try:
+            resource.check(resource.value)
+            resource.checked_at = time.monotonic()
+        except Exception:
+            logger.warning("%s failed its health check, reconnecting", key[0])
+            with _lock:
+                if _resources.get(key) is resource:
+                    del _resources[key]
+            _close(key, resource)
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = _Resource(factory(), close, check)
+            _resources[key] = resource
+        return resource.value
+
+
+def discard(key, value):
+    # Drops a resource its user found broken, so the next shared() call for
+    # the key builds a new one.
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None or resource.value is not value:
+            return
+        del _resources[key]
+    _close(key, resource)
+
+
+def shutdown():
+    with _lock:
+        for key, resource in list(_resources.items()):
+            _close(key, resource)
+        _resources.clear()
+
+
+atexit.register(shutdown)
+
+
+def _options(kwargs):
+    return tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+
+
+def get_mongo_client(uri=MONGO_URI):
+    from pymongo import MongoClient
+
+    return shared(
+        ("mongo", uri),
+        lambda: MongoClient(uri, serverSelectionTimeoutMS=5000),
+        close=lambda client: client.close(),
+        check=lambda client: client.admin.command("ping"),
+    )
+
+
+def get_resume_db():
+    return get_mongo_client()[MONGO_DB]
+
+
+def get_engine(url):
+    from sqlalchemy import create_engine
+
+    return shared(
+        ("sqlalchemy", url),
+        lambda: create_engine(url, echo=False, pool_pre_ping=True),
+        close=lambda engine: engine.dispose(),
+    )
+
+
+def _install_llm_cache():
+    # Imported here so that pages only load LangChain once they build a model.
+    from llm_cache import install_llm_cache
+
+    install_llm_cache()
+
+
+def get_chat_openai(model, api_key, **kwargs):
+    from langchain_openai import ChatOpenAI
+
+    from llm_usage import UsageHandler
+
+    _install_llm_cache()
+    # stream_usage asks OpenAI for token counts on streamed answers as well.
+    return shared(
+        ("chat_openai", model, api_key, _options(kwargs)),
+        lambda: ChatOpenAI(model=model, api_key=api_key, stream_usage=True, callbacks=[UsageHandler(model)], **kwargs),
+    )
+
+
+def get_openai_embeddings(api_key):
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_cache import CachedEmbeddings
+
+    return shared(
+        ("openai_embeddings", api_key),
+        lambda: CachedEmbeddings(OpenAIEmbeddings(api_key=api_key)),
+    )
+
+
+def get_google_chat(model, **kwargs):
+    from langchain_google_genai import ChatGoogleGenerativeAI  # type: ignore
+
+    from llm_usage import UsageHandler
+
+    _install_llm_cache()
+    return shared(
+        ("google_chat", model, _options(kwargs)),
+        lambda: ChatGoogleGenerativeAI(model=model, callbacks=[UsageHandler(model)], **kwargs),
+    )
+
+
+def get_google_embeddings(model):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings  # type: ignore
+
+    from embedding_cache import CachedEmbeddings
+
+    return shared(
+        ("google_embeddings", model),
+        lambda: CachedEmbeddings(GoogleGenerativeAIEmbeddings(model=model)),
+    )
@@ -0,0 +1,125 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+MAX_WORKERS = int(os.getenv("RESUME_PDF_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+
+class ResumeDetails(NamedTuple):
+    name: str
+    email: str
+    phone: str
+    address: str
+    education: List[str]
+    experience: List[str]
+    skills: List[str]
+    hobbies: List[str]
+    languages: List[str]
+    leetcode_stats: Dict
+
+
+class ResumeStyles(NamedTuple):
+    title: ParagraphStyle
+    subtitle: ParagraphStyle
+    content: ParagraphStyle
+    header: ParagraphStyle
+    columns: TableStyle
+
+
+@lru_cache(maxsize=1)
+def get_styles():
+    # Styles are never modified while a document is built, so one set is
+    # shared by every render in the process.
+    styles = getSampleStyleSheet()
+    return ResumeStyles(
+        title=ParagraphStyle(
+            'TitleStyle', parent=styles['Title'], fontName='Helvetica-Bold', fontSize=24, alignment=TA_CENTER
+        ),
+        subtitle=ParagraphStyle(
+            'SubtitleStyle', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=14, spaceAfter=12, alignment=TA_LEFT
+        ),
+        content=ParagraphStyle(
+            'ContentStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=12, spaceAfter=10, leading=14
+        ),
+        header=ParagraphStyle(
+            'HeaderStyle', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=10, spaceAfter=10, alignment=TA_CENTER
+        ),
+        columns=TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+        ]),
+    )
+
+
+def _section(styles, title, items, bullet=True):
+    section = [Paragraph(title, styles.subtitle), HRFlowable(width="40%", thickness=1, color="black", spaceAfter=6)]
+    for item in items:
+        section.append(Paragraph(f"• {item}" if bullet else item, styles.content))
+    section.append(Spacer(1, 12))
+    return section
+
+
+def render_resume(details):
+    # Returns the PDF as bytes; nothing is written to disk.
+    styles = get_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+    content = [Paragraph(details.name, styles.title), Spacer(1, 6)]
+    contact_info = f"{details.email} &nbsp;&nbsp;|&nbsp;&nbsp; {details.phone}|&nbsp;&nbsp;{details.address}"
+    content.append(Paragraph(contact_info.replace("\n", ", "), styles.header))
+    content.append(HRFlowable(width="100%", thickness=1, color="black"))
+    content.append(Spacer(1, 12))
+
+    # Left half: Education, Work Experience, Hobbies
+    left_column = []
+    left_column.extend(_section(styles, "Education", details.education, False))
+    left_column.extend(_section(styles, "Work Experience", details.experience, False))
+    left_column.extend(_section(styles, "Hobbies", details.hobbies))
+
+    # Right half: Skills, LeetCode Stats, Languages
+    stats = details.leetcode_stats
+    leetcode_stats_section = [
+        f"Total Problems Solved: {stats.get('totalSolved', 'N/A')}",
+        f"Easy Problems Solved: {stats.get('easySolved', 'N/A')} / {stats.get('totalEasy', 'N/A')}",
+        f"Medium Problems Solved: {stats.get('mediumSolved', 'N/A')} / {stats.get('totalMedium', 'N/A')}",
+        f"Hard Problems Solved: {stats.get('hardSolved', 'N/A')} / {stats.get('totalHard', 'N/A')}",
+    ]
+    right_column = []
+    right_column.extend(_section(styles, "Skills", details.skills))
+    right_column.extend(_section(styles, "LeetCode Stats", leetcode_stats_section, False))
+    right_column.extend(_section(styles, "Languages", details.languages))
+
+    # Combine both columns into a table layout
+    table = Table([[left_column, right_column]], colWidths=[3.5 * inch, 3.5 * inch])
+    table.setStyle(styles.columns)
+    content.append(table)
+    doc.build(content)
+    return buffer.getvalue()
+
+
+def render_resumes(resumes, max_workers=MAX_WORKERS):
+    # Renders a cohort of ResumeDetails in worker processes, returning the
+    # PDFs in input order. Workers are spawned rather than forked because the
+    # Streamlit server process is multi-threaded.
+    resumes = list(resumes)
+    if len(resumes) < 2 or max_workers <= 1:
+        return [render_resume(details) for details in resumes]
+    workers = min(max_workers, len(resumes))
+    chunksize = max(1, len(resumes) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(render_resume, resumes, chunksize=chunksize))
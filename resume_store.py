@@ -0,0 +1,151 @@
+import io
+import logging
+import os
+import time
+
+import gridfs
+import numpy as np
+from bson.binary import Binary
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from chunking import CHUNKING, chunk_resume
+from disk_cache import content_hash
+import metrics
+from embedding_cache import embedding_model_name
+from pdf_text import get_pdf_text, read_pdf_bytes
+from resources import get_resume_db
+from vector_index import InMemoryVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Same collections (resumes.files / resumes.chunks) the pages used through
+# gridfs.GridFS(db, collection='resumes').
+RESUME_BUCKET = "resumes"
+UPLOAD_CHUNK_BYTES = 255 * 1024
+# One document per distinct resume, keyed by the SHA-256 of the PDF: the
+# GridFS file id, the extracted text and, per embedding model and chunking,
+# the chunks and their vectors.
+ARTIFACTS_COLLECTION = "resume_artifacts"
+# RESUME_STORE=0 indexes uploads locally without MongoDB (development,
+# offline benchmarks).
+ENABLED = os.getenv("RESUME_STORE", "1") != "0"
+# After a failure the store is left alone for this long, so that a batch does
+# not wait out MongoDB's server selection timeout on every resume.
+RETRY_SECONDS = float(os.getenv("RESUME_STORE_RETRY_SECONDS", "60"))
+
+_unavailable_until = 0.0
+
+
+def get_bucket():
+    return gridfs.GridFSBucket(get_resume_db(), bucket_name=RESUME_BUCKET, chunk_size_bytes=UPLOAD_CHUNK_BYTES)
+
+
+def get_artifacts():
+    return get_resume_db()[ARTIFACTS_COLLECTION]
+
+
+def _filename(pdf, digest):
+    name = getattr(pdf, "name", None) or (pdf if isinstance(pdf, str) else None)
+    return os.path.basename(name) if name else f"{digest[:12]}.pdf"
+
+
+def store_resume(pdf):
+    # Returns the SHA-256 of the PDF; the file is uploaded only the first time
+    # its content is seen, whatever it is called.
+    data = read_pdf_bytes(pdf)
+    digest = content_hash(data)
+    artifacts = get_artifacts()
+    if artifacts.find_one({"_id": digest, "file_id": {"$exists": True}}, {"_id": 1}):
+        return digest
+
+    filename = _filename(pdf, digest)
+    bucket = get_bucket()
+    with metrics.stage("db_write", store="gridfs", size=len(data)):
+        file_id = bucket.upload_from_stream(filename, io.BytesIO(data), metadata={"sha256": digest, "contentType": "application/pdf"})
+        try:
+            artifacts.update_one(
+                {"_id": digest, "file_id": {"$exists": False}},
+                {"$set": {"file_id": file_id, "filename": filename, "stored": time.time()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another session stored the same resume first; keep its copy.
+            bucket.delete(file_id)
+    return digest
+
+
+def download_resume(filename, destination):
+    # Streams the newest stored copy one GridFS chunk at a time instead of
+    # reading it into memory. Iterating a GridOut would split it on newlines.
+    with get_bucket().open_download_stream_by_name(filename) as grid_out, open(destination, "wb") as output:
+        for chunk in iter(grid_out.readchunk, b""):
+            output.write(chunk)
+    return destination
+
+
+def _index_key(embedding, chunking):
+    # Field names may not contain dots, which model names often do.
+    return content_hash(f"{embedding_model_name(embedding)}|{chunking}")[:16]
+
+
+def _build_index(embedding, chunks, vectors):
+    index = InMemoryVectorIndex(embedding)
+    index.add_vectors(chunks, vectors)
+    return index
+
+
+def _index_locally(pdf, embedding, split):
+    chunks = split(get_pdf_text(pdf))
+    return _build_index(embedding, chunks, embedding.embed_documents(chunks) if chunks else [])
+
+
+def _store_failed():
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + RETRY_SECONDS
+
+
+def load_resume_index(pdf, embedding, split=chunk_resume, chunking=CHUNKING):
+    # Vector index over the resume's chunks. `chunking` names the settings of
+    # `split`; stored chunks and vectors are only reused for the same
+    # chunking and embedding model, so a known resume is neither parsed nor
+    # embedded again on any page.
+    if not ENABLED or time.monotonic() < _unavailable_until:
+        return _index_locally(pdf, embedding, split)
+    key = _index_key(embedding, chunking)
+    try:
+        digest = store_resume(pdf)
+        document = get_artifacts().find_one({"_id": digest}, {"text": 1, f"indexes.{key}": 1}) or {}
+    except PyMongoError:
+        logger.warning("resume store unavailable, indexing without it for %ss", RETRY_SECONDS, exc_info=True)
+        _store_failed()
+        return _index_locally(pdf, embedding, split)
+
+    stored = document.get("indexes", {}).get(key)
+    metrics.cache("resume_artifacts", hits=int(bool(stored)), misses=int(not stored))
+    if stored:
+        vectors = np.frombuffer(stored["vectors"], dtype=np.float32).reshape(len(stored["chunks"]), stored["dim"])
+        return _build_index(embedding, stored["chunks"], vectors)
+
+    text = document.get("text")
+    update = {}
+    if text is None:
+        text = get_pdf_text(pdf)
+        update["text"] = text
+    chunks = split(text)
+    vectors = np.asarray(embedding.embed_documents(chunks), dtype=np.float32) if chunks else []
+    if chunks:
+        update[f"indexes.{key}"] = {
+            "model": embedding_model_name(embedding),
+            "chunking": chunking,
+            "chunks": chunks,
+            "dim": int(vectors.shape[1]),
+            "vectors": Binary(vectors.tobytes()),
+        }
+    if update:
+        try:
+            with metrics.stage("db_write", store="resume_artifacts"):
+                get_artifacts().update_one({"_id": digest}, {"$set": update})
+        except PyMongoError:
+            logger.warning("could not store artifacts for resume %s", digest[:12], exc_info=True)
+            _store_failed()
+    return _build_index(embedding, chunks, vectors)
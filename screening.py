@@ -0,0 +1,171 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+
+import numpy as np
+from langchain.output_parsers import PydanticOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.runnables import RunnablePassthrough, RunnableParallel
+
+import metrics
+from resume_store import load_resume_index
+
+MAX_WORKERS = int(os.getenv("SCREENING_MAX_WORKERS", "8"))
+# Rating calls allowed to start per minute, across all workers.
+REQUESTS_PER_MINUTE = int(os.getenv("SCREENING_REQUESTS_PER_MINUTE", "60"))
+# Only the resumes closest to the job specification are sent to the LLM rater.
+TOP_K = int(os.getenv("SCREENING_TOP_K", "20"))
+
+RATING_TEMPLATE = '''
+    Use the following pieces of context to answer the user's question.
+    If you don't know the answer, just say that you don't know, don't try to make up an answer.
+    ----------------
+    Context:
+    {context}
+    ----------------
+    Question:
+    {query}
+    ----------------
+    Finally Format the answer in the following format:
+    {format_instructions}
+
+    Answer:
+    '''
+
+
+class Job(BaseModel):
+    name: str = Field(description="applicant's name in the resume")
+    rating: int = Field(description="rating of the candidate's resume")
+
+
+class ScreeningResult(NamedTuple):
+    filename: str
+    job: Optional[Job]
+    similarity: Optional[float]
+    error: Optional[str]
+    seconds: float
+
+
+class RateLimiter:
+    # Spaces calls evenly so no more than `per_minute` start in any minute.
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def rating_question(job_specification):
+    return f'Retrieve the applicant name and rate the resume on a scale of 1 to 100 based on the job specifications: "{job_specification}" and get the applicant name in the resume and rating of the resume as output.'
+
+
+def index_resume(pdf, embedding):
+    vectorstore = load_resume_index(pdf, embedding)
+    if not len(vectorstore):
+        raise ValueError("no text could be extracted from the resume")
+    return vectorstore
+
+
+def rank_resumes(job_vector, resume_vectors):
+    # Cosine similarity of every resume against the job specification in one
+    # matrix-vector product.
+    matrix = np.asarray(resume_vectors, dtype=np.float32)
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = np.asarray(job_vector, dtype=np.float32)
+    return matrix @ (query / np.linalg.norm(query))
+
+
+def rate_resume(vectorstore, job_specification, llm, limiter=None):
+    parser = PydanticOutputParser(pydantic_object=Job)
+    prompt = PromptTemplate(
+        template=RATING_TEMPLATE,
+        input_variables=["context", "query"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    chain = RunnableParallel({"context": vectorstore.as_retriever(), "query": RunnablePassthrough()}) | prompt | llm | parser
+
+    if limiter is not None:
+        limiter.wait()
+    return chain.invoke(rating_question(job_specification))
+
+
+def applicant_from_filename(filename):
+    return os.path.splitext(filename)[0]
+
+
+def _describe(e):
+    return f"{type(e).__name__}: {e}"
+
+
+def screen_resumes(pdfs, job_specification, llm, embedding, top_k=TOP_K,
+                   max_workers=MAX_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE):
+    # Yields one ScreeningResult per resume. Every resume is embedded and
+    # scored against the job specification; only the top_k most similar are
+    # rated by the LLM, the rest are returned with their similarity alone. A
+    # failing resume is reported in its result and never aborts the batch.
+    limiter = RateLimiter(requests_per_minute)
+    # Workers run each call in a copy of this context, so what they record is
+    # attributed to the caller's session and request.
+    metrics.bind_session()
+
+    def submit(fn, *args):
+        return executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def build(pdf):
+        filename = getattr(pdf, "name", "resume.pdf")
+        start = time.perf_counter()
+        try:
+            return filename, index_resume(pdf, embedding), None, time.perf_counter() - start
+        except Exception as e:
+            return filename, None, _describe(e), time.perf_counter() - start
+
+    def rate(filename, vectorstore, similarity, elapsed):
+        start = time.perf_counter()
+        try:
+            job = rate_resume(vectorstore, job_specification, llm, limiter)
+        except Exception as e:
+            return ScreeningResult(filename, None, similarity, _describe(e), elapsed + time.perf_counter() - start)
+        if not job.name:
+            job.name = applicant_from_filename(filename)
+        return ScreeningResult(filename, job, similarity, None, elapsed + time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        indexed = []
+        for future in as_completed([submit(build, pdf) for pdf in pdfs]):
+            filename, vectorstore, error, seconds = future.result()
+            if error:
+                yield ScreeningResult(filename, None, None, error, seconds)
+            else:
+                indexed.append((filename, vectorstore, seconds))
+        if not indexed:
+            return
+
+        try:
+            scores = rank_resumes(
+                embedding.embed_query(job_specification),
+                [vectorstore.mean_vector() for _, vectorstore, _ in indexed],
+            )
+        except Exception as e:
+            for filename, _, seconds in indexed:
+                yield ScreeningResult(filename, None, None, _describe(e), seconds)
+            return
+
+        order = np.argsort(-scores)
+        for i in order[top_k:]:
+            filename, _, seconds = indexed[i]
+            yield ScreeningResult(filename, None, float(scores[i]), None, seconds)
+
+        futures = [submit(rate, indexed[i][0], indexed[i][1], float(scores[i]), indexed[i][2]) for i in order[:top_k]]
+        for future in as_completed(futures):
+            yield future.result()
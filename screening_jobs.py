@@ -0,0 +1,344 @@
+import functools
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+
+import metrics
+from disk_cache import CACHE_DIR, content_hash
+from hirer_db import Candidate, create_database, get_engine, get_job_spec_id, save_ratings, screening_job, screening_result
+from pdf_text import read_pdf_bytes
+from resources import discard, shared
+
+logger = logging.getLogger(__name__)
+
+# Uploaded resumes wait here, one directory per job, until the job has run.
+SPOOL_DIR = os.path.join(CACHE_DIR, "screening_jobs")
+# Jobs screened at the same time, each in its own worker process; a job
+# screens its resumes with screening.MAX_WORKERS threads.
+MAX_JOBS = int(os.getenv("SCREENING_MAX_JOBS", "2"))
+SCREENING_MODEL = "gpt-4o"
+FINISHED = ("done", "failed")
+POOL_KEY = ("screening_jobs",)
+
+# Jobs submitted to each pool and not yet done. A broken pool is replaced only
+# once all of its jobs are settled, so that the new pool does not start a job
+# the old one is still about to mark failed.
+_pool_jobs = {}
+_pool_jobs_lock = threading.Lock()
+
+
+class JobProgress(NamedTuple):
+    id: int
+    job_specification: str
+    job_spec_id: int
+    top_k: int
+    status: str
+    total: int
+    done: int
+    error: Optional[str]
+    created: float
+    finished: Optional[float]
+
+
+class ResultRow(NamedTuple):
+    resume: str
+    done: bool
+    applicant_name: Optional[str]
+    similarity: Optional[float]
+    rating: Optional[int]
+    seconds: Optional[float]
+    error: Optional[str]
+
+
+def _spool(job_id):
+    return os.path.join(SPOOL_DIR, str(job_id))
+
+
+def _unique_names(names):
+    # Results are matched back to their resume by file name, so a generated
+    # name must not collide with an uploaded one either.
+    used = set()
+    unique = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        candidate = name
+        copy = 1
+        while candidate in used:
+            copy += 1
+            candidate = f"{stem} ({copy}){ext}"
+        used.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+def _describe(e):
+    return f"{type(e).__name__}: {e}"
+
+
+def _finish(job_id, status, error=None, only_running=False):
+    # Returns whether the job was finished; with only_running, a job that has
+    # not started is left as it is.
+    query = update(screening_job).where(screening_job.c.id == job_id)
+    if only_running:
+        query = query.where(screening_job.c.status == "running")
+    with get_engine().begin() as conn:
+        finished = conn.execute(query.values(status=status, error=error, finished=time.time())).rowcount
+    if finished:
+        shutil.rmtree(_spool(job_id), ignore_errors=True)
+    return bool(finished)
+
+
+def run_job(job_id, api_key, session=None):
+    # Runs in a worker process and returns the metrics of the job, which the
+    # server process adds to its own; a worker's numbers otherwise only reach
+    # the metrics file.
+    metrics.set_session(session)
+    with metrics.collect() as totals:
+        _run_job(job_id, api_key)
+    return totals.summary()
+
+
+def _run_job(job_id, api_key):
+    # Each result is written as soon as it arrives so the page can show
+    # progress; the ratings go to the job table at the end, as they did when
+    # the page screened the batch itself.
+    from resources import get_chat_openai, get_openai_embeddings
+    from screening import applicant_from_filename, screen_resumes
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        job = conn.execute(select(screening_job).where(screening_job.c.id == job_id)).one()
+        conn.execute(
+            update(screening_job)
+            .where(screening_job.c.id == job_id)
+            .values(status="running", started=time.time(), error=None)
+        )
+        # A job interrupted by a server restart starts over; the resumes it
+        # had already embedded come from the embedding cache.
+        conn.execute(
+            update(screening_result)
+            .where(screening_result.c.job_id == job_id)
+            .values(done=0, applicant_name=None, similarity=None, rating=None, seconds=None, error=None)
+        )
+        rows = conn.execute(
+            select(screening_result.c.position, screening_result.c.resume)
+            .where(screening_result.c.job_id == job_id)
+            .order_by(screening_result.c.position)
+        ).all()
+
+    def save_result(position, **values):
+        with engine.begin() as conn:
+            conn.execute(
+                update(screening_result)
+                .where(screening_result.c.job_id == job_id, screening_result.c.position == position)
+                .values(done=1, **values)
+            )
+
+    positions = {}
+    hashes = {}
+    pdfs = []
+    for position, resume in rows:
+        try:
+            with open(os.path.join(_spool(job_id), f"{position}.pdf"), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            save_result(position, error=_describe(e))
+            continue
+        pdf = io.BytesIO(data)
+        pdf.name = resume
+        positions[resume] = position
+        hashes[resume] = content_hash(data)
+        pdfs.append(pdf)
+    job_spec_id = job.job_spec_id or get_job_spec_id(job.job_specification)
+
+    candidates = []
+    try:
+        with metrics.request("screening_job", resumes=len(rows)):
+            llm = get_chat_openai(SCREENING_MODEL, api_key)
+            embedding = get_openai_embeddings(api_key)
+            for result in screen_resumes(pdfs, job.job_specification, llm, embedding, top_k=job.top_k):
+                if result.job:
+                    candidates.append(Candidate(result.job.name, result.job.rating, result.similarity, hashes[result.filename]))
+                elif not result.error:
+                    candidates.append(Candidate(applicant_from_filename(result.filename), None, result.similarity, hashes[result.filename]))
+                save_result(
+                    positions[result.filename],
+                    applicant_name=result.job.name if result.job else None,
+                    similarity=result.similarity,
+                    rating=result.job.rating if result.job else None,
+                    seconds=result.seconds,
+                    error=result.error,
+                )
+            save_ratings(job_spec_id, candidates)
+    except Exception as e:
+        logger.exception("screening job %s failed", job_id)
+        _finish(job_id, "failed", _describe(e))
+        return
+    _finish(job_id, "done")
+
+
+def _untrack(pool, job_id):
+    # Returns whether the pool has no jobs left.
+    with _pool_jobs_lock:
+        jobs = _pool_jobs.get(pool, set())
+        jobs.discard(job_id)
+        if jobs:
+            return False
+        _pool_jobs.pop(pool, None)
+        return True
+
+
+def _job_done(pool, job_id, session, future):
+    # run_job records its own failures; this catches a worker process that
+    # died. Jobs cancelled by a shutdown stay queued and are resumed.
+    error = None if future.cancelled() else future.exception()
+    if error is None and not future.cancelled():
+        metrics.merge(future.result(), session)
+    elif isinstance(error, BrokenProcessPool):
+        # A worker that dies (out of memory, a crash in native code) breaks
+        # the whole pool and fails every job in it. Only the jobs that had
+        # started are marked failed, so a resume that crashes its worker does
+        # not do so again; the others stay queued for the next pool.
+        if _finish(job_id, "failed", _describe(error), only_running=True):
+            logger.error("screening job %s crashed: %s", job_id, _describe(error))
+        else:
+            logger.warning("screening job %s requeued after its pool broke", job_id)
+    elif error is not None:
+        logger.error("screening job %s crashed: %s", job_id, _describe(error))
+        _finish(job_id, "failed", _describe(error))
+    if _untrack(pool, job_id) and isinstance(error, BrokenProcessPool):
+        # The next get_pool() builds a new pool, which starts the queued jobs.
+        discard(POOL_KEY, pool)
+
+
+def _submit(pool, job_id, api_key, session=None):
+    future = pool.submit(run_job, job_id, api_key, session)
+    with _pool_jobs_lock:
+        _pool_jobs.setdefault(pool, set()).add(job_id)
+    future.add_done_callback(functools.partial(_job_done, pool, job_id, session))
+
+
+def _start_pool(api_key):
+    # Workers are spawned rather than forked because the Streamlit server
+    # process is multi-threaded.
+    pool = ProcessPoolExecutor(max_workers=MAX_JOBS, mp_context=multiprocessing.get_context("spawn"))
+    create_database()
+    with get_engine().connect() as conn:
+        unfinished = conn.execute(
+            select(screening_job.c.id)
+            .where(screening_job.c.status.notin_(FINISHED))
+            .order_by(screening_job.c.id)
+        ).scalars().all()
+    # Jobs left queued or running by a previous server process.
+    for job_id in unfinished:
+        logger.info("resuming screening job %s", job_id)
+        _submit(pool, job_id, api_key)
+    return pool
+
+
+def get_pool(api_key):
+    # One pool per server process; building it resumes unfinished jobs.
+    return shared(
+        POOL_KEY,
+        lambda: _start_pool(api_key),
+        close=lambda pool: pool.shutdown(wait=False, cancel_futures=True),
+    )
+
+
+def submit(pdfs, job_specification, top_k, api_key):
+    # Stores the batch and queues it; returns the job id at once. The job
+    # keeps running whatever happens to the session that submitted it.
+    pool = get_pool(api_key)
+    names = _unique_names([os.path.basename(getattr(pdf, "name", "") or f"resume-{i}.pdf") for i, pdf in enumerate(pdfs)])
+    job_spec_id = get_job_spec_id(job_specification)
+    with get_engine().begin() as conn:
+        job_id = conn.execute(
+            screening_job.insert().values(
+                job_specification=job_specification,
+                job_spec_id=job_spec_id,
+                top_k=top_k,
+                status="queued",
+                total=len(pdfs),
+                created=time.time(),
+            )
+        ).inserted_primary_key[0]
+        conn.execute(
+            screening_result.insert(),
+            [{"job_id": job_id, "position": i, "resume": name, "done": 0} for i, name in enumerate(names)],
+        )
+    os.makedirs(_spool(job_id), exist_ok=True)
+    for i, pdf in enumerate(pdfs):
+        with open(os.path.join(_spool(job_id), f"{i}.pdf"), "wb") as f:
+            f.write(read_pdf_bytes(pdf))
+    try:
+        _submit(pool, job_id, api_key, metrics.current_session())
+    except BrokenProcessPool:
+        # The job stays queued for the next pool. A pool that broke with jobs
+        # in it is replaced once they are settled; one that broke idle is
+        # replaced here.
+        logger.warning("screening pool is broken, starting a new one")
+        with _pool_jobs_lock:
+            idle = pool not in _pool_jobs
+        if idle:
+            discard(POOL_KEY, pool)
+        get_pool(api_key)
+    return job_id
+
+
+def _progress_query():
+    done = func.coalesce(func.sum(screening_result.c.done), 0)
+    return (
+        select(
+            screening_job.c.id,
+            screening_job.c.job_specification,
+            screening_job.c.job_spec_id,
+            screening_job.c.top_k,
+            screening_job.c.status,
+            screening_job.c.total,
+            done,
+            screening_job.c.error,
+            screening_job.c.created,
+            screening_job.c.finished,
+        )
+        .select_from(screening_job.outerjoin(screening_result, screening_result.c.job_id == screening_job.c.id))
+        .group_by(screening_job.c.id)
+    )
+
+
+def recent_jobs(limit=10) -> List[JobProgress]:
+    query = _progress_query().order_by(screening_job.c.id.desc()).limit(limit)
+    with get_engine().connect() as conn:
+        return [JobProgress(*row) for row in conn.execute(query)]
+
+
+def get_job(job_id) -> Optional[JobProgress]:
+    with get_engine().connect() as conn:
+        row = conn.execute(_progress_query().where(screening_job.c.id == job_id)).first()
+    return JobProgress(*row) if row else None
+
+
+def get_results(job_id) -> List[ResultRow]:
+    query = (
+        select(
+            screening_result.c.resume,
+            screening_result.c.done,
+            screening_result.c.applicant_name,
+            screening_result.c.similarity,
+            screening_result.c.rating,
+            screening_result.c.seconds,
+            screening_result.c.error,
+        )
+        .where(screening_result.c.job_id == job_id)
+        .order_by(screening_result.c.position)
+    )
+    with get_engine().connect() as conn:
+        return [ResultRow(resume, bool(done), *rest) for resume, done, *rest in conn.execute(query)]
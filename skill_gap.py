@@ -0,0 +1,60 @@
+from operator import itemgetter
+from typing import List
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.runnables import RunnableParallel
+
+
+class Course(BaseModel):
+    title: str = Field(description="name of the course")
+    skill: str = Field(description="missing skill that the course improves")
+    link: str = Field(description="link to the course")
+
+
+class SkillGapReport(BaseModel):
+    candidate_skills: List[str] = Field(description="skills possessed by the candidate according to the resume")
+    required_skills: List[str] = Field(description="skills that are necessary for the job role")
+    missing_skills: List[str] = Field(description="required skills that the candidate does not have yet")
+    gap_analysis: str = Field(description="comparison of the candidate skills with the required skills for the job role")
+    courses: List[Course] = Field(description="courses that the candidate should take to improve their skills")
+
+
+SKILL_GAP_TEMPLATE = '''You are an experienced Human Resource Manager and Courses recommendor who is specialized in analyzing the job resumes of the candidate and suggest them courses to imporove their skills.
+Use the following pieces of the candidate's resume to extract the skills of the candidate, get the required skills that are necessary for the job role {job_role}
+and compare them. Then, based on the job role {job_role} and work experience {work_experience}, suggest the courses that the candidate should take to
+improve the missing skills and provide course links on those topics.
+----------------
+Resume:
+{skills_context}
+
+{experience_context}
+----------------
+Format the answer in the following format:
+{format_instructions}
+'''
+
+
+def format_docs(docs):
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def get_skill_gap_chain(vectorstore, llm):
+    # JsonOutputParser yields the partially parsed report while the model streams.
+    parser = JsonOutputParser(pydantic_object=SkillGapReport)
+    prompt = PromptTemplate(
+        template=SKILL_GAP_TEMPLATE,
+        input_variables=["job_role", "work_experience", "skills_context", "experience_context"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    retriever = vectorstore.as_retriever()
+    # The two resume lookups are independent, so they run in parallel and feed
+    # a single LLM call instead of three sequential conversational turns.
+    context = RunnableParallel({
+        "job_role": itemgetter("job_role"),
+        "work_experience": itemgetter("work_experience"),
+        "skills_context": (lambda _: "technical skills, tools and technologies") | retriever | format_docs,
+        "experience_context": (lambda _: "work experience, projects and education") | retriever | format_docs,
+    })
+    return context | prompt | llm | parser
@@ -1,5 +1,4 @@
 import streamlit as st
-from streamlit_option_menu import option_menu
 from menu import menu
 
 st.set_page_config(page_title="Complan AI", page_icon="🧠", layout="centered")
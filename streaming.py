@@ -0,0 +1,55 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+# ConversationalRetrievalChain rewrites follow-up questions with a separate LLM
+# call; runs carrying this tag are not shown to the user.
+CONDENSE_TAG = "condense_question"
+
+
+class StreamTimer:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.first_token_at = None
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self):
+        finished = time.perf_counter()
+        ttft = (self.first_token_at or finished) - self.started
+        metrics.record("llm_stream", page=self.page, ttft=ttft, total=finished - self.started)
+
+
+class StreamHandler(BaseCallbackHandler):
+    # Writes the answer into a Streamlit placeholder token by token.
+    def __init__(self, container, page):
+        self.container = container
+        self.text = ""
+        self.timer = StreamTimer(page)
+
+    def on_llm_new_token(self, token, *, tags=None, **kwargs):
+        if tags and CONDENSE_TAG in tags:
+            return
+        self.timer.token()
+        self.text += token
+        self.render(self.text + "▌")
+
+    def on_llm_end(self, response, *, tags=None, **kwargs):
+        # Non-streaming and cached responses arrive in one piece.
+        if (tags and CONDENSE_TAG in tags) or self.text:
+            return
+        self.timer.token()
+        self.text = response.generations[0][0].text
+        self.render(self.text)
+
+    def render(self, text):
+        self.container.markdown(text)
+
+    def finish(self):
+        self.render(self.text)
+        self.timer.finish()
@@ -0,0 +1,95 @@
+import base64
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple
+
+from disk_cache import DiskCache
+from resources import shared
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://www.udemy.com/api-2.0/courses/"
+# id is needed to merge the same course found by several queries.
+COURSE_FIELDS = "id,title,headline,url,num_subscribers,avg_rating,price"
+PAGE_SIZE = int(os.getenv("UDEMY_PAGE_SIZE", "5"))
+TIMEOUT = (3.05, 10)
+SEARCH_TTL = int(os.getenv("UDEMY_SEARCH_TTL", str(12 * 60 * 60)))
+MAX_WORKERS = int(os.getenv("UDEMY_MAX_WORKERS", "6"))
+
+_cache = DiskCache("udemy_search", max_entries=2048, ttl=SEARCH_TTL)
+_search_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="udemy-search")
+
+
+class SearchResults(NamedTuple):
+    courses: List[Dict]
+    errors: Dict[str, str]
+
+
+def auth_header(client_id, client_secret):
+    token = base64.b64encode(f"{client_id}:{client_secret}".encode("ascii")).decode("ascii")
+    return {"Authorization": f"Basic {token}"}
+
+
+class UdemyClient:
+    # One keep-alive session per credential pair with the auth header set once.
+    def __init__(self, client_id, client_secret):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+        self.session.headers.update(auth_header(client_id, client_secret))
+        self.session.headers["Accept"] = "application/json"
+
+    def close(self):
+        self.session.close()
+
+    def search(self, query, fields=COURSE_FIELDS, page=1, page_size=PAGE_SIZE):
+        key = json.dumps([" ".join(query.lower().split()), fields, page, page_size])
+        courses = _cache.get(key)
+        if courses is not None:
+            return courses
+        params = {
+            "search": query,
+            "page": page,
+            "page_size": page_size,
+            "fields[course]": fields,
+        }
+        response = self.session.get(API_URL, params=params, timeout=TIMEOUT)
+        response.raise_for_status()
+        courses = response.json().get("results", [])
+        _cache.set(key, courses)
+        return courses
+
+    def search_many(self, queries, fields=COURSE_FIELDS, page=1, page_size=PAGE_SIZE):
+        # Runs the queries concurrently and interleaves their results, so every
+        # query is represented near the top. A course found by several queries
+        # appears once, with all of them listed under "matched".
+        queries = list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+        futures = {query: _search_pool.submit(self.search, query, fields, page, page_size) for query in queries}
+        found = {}
+        errors = {}
+        for query, future in futures.items():
+            try:
+                found[query] = future.result()
+            except Exception as e:
+                logger.warning("Udemy search for %r failed: %s", query, e)
+                errors[query] = str(e)
+
+        merged = {}
+        for rank in range(max((len(courses) for courses in found.values()), default=0)):
+            for query, courses in found.items():
+                if rank >= len(courses):
+                    continue
+                course = courses[rank]
+                key = course.get("id") or course.get("url")
+                if key not in merged:
+                    merged[key] = dict(course, matched=[])
+                merged[key]["matched"].append(query)
+        return SearchResults(list(merged.values()), errors)
+
+
+def get_client(client_id, client_secret):
+    return shared(("udemy", client_id, client_secret), lambda: UdemyClient(client_id, client_secret), close=UdemyClient.close)
@@ -0,0 +1,86 @@
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+import metrics
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class InMemoryVectorIndex(VectorStore):
+    # Per-session replacement for the DeepLake dataset the pages used to write
+    # to a shared path and force-delete afterwards. Rows are kept L2-normalised
+    # so cosine top-k is a single matrix-vector product.
+    def __init__(self, embedding):
+        self._embedding = embedding
+        self._matrix = None
+        self._documents = []
+        self._ids = []
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(texts, self._embedding.embed_documents(texts), metadatas)
+
+    def add_vectors(self, texts, vectors, metadatas=None):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(uuid.uuid4()) for _ in texts]
+        rows = _normalize(np.asarray(vectors, dtype=np.float32))
+        self._matrix = rows if self._matrix is None else np.vstack([self._matrix, rows])
+        self._documents.extend(Document(page_content=text, metadata=dict(metadata)) for text, metadata in zip(texts, metadatas))
+        self._ids.extend(ids)
+        return ids
+
+    def mean_vector(self):
+        # Unit-length centroid of the stored rows, used as a whole-document
+        # embedding without another round trip to the embedding API.
+        if self._matrix is None:
+            raise ValueError("index is empty")
+        return _normalize(self._matrix.mean(axis=0))
+
+    @metrics.timed("retrieve")
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        if not self._documents:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        scores = self._matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._documents[i], float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity lies in [-1, 1]; LangChain expects [0, 1].
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        index = cls(embedding)
+        index.add_texts(texts, metadatas)
+        return index